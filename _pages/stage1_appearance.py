@@ -2,8 +2,10 @@
 Stage 1: Character Appearance - Generate character from visual appearance
 """
 import streamlit as st
-import base64
+import config
 from models.character import Character
+from services import async_bridge
+from services.image_store import load_image
 
 
 def render_stage_1(services, get_current_character, set_current_character, set_current_stage):
@@ -73,9 +75,10 @@ def render_stage_1(services, get_current_character, set_current_character, set_c
         char = get_current_character()
         
         # Show generated image if it exists
-        if char.images_base64 and len(char.images_base64) > 0:
+        image = load_image(char.image_keys[0], "display") if char.image_keys else None
+        if image:
             st.subheader("🖼️ Current Character Concept")
-            st.image(base64.b64decode(char.images_base64[0]), use_container_width=True)
+            st.image(image, use_container_width=True)
             with st.expander("View Prompt"):
                 st.code(char.image_prompts[0])
         else:
@@ -100,18 +103,18 @@ def render_stage_1(services, get_current_character, set_current_character, set_c
             - Talk one-on-one with your character
             - Characters maintain their personality and context
             
-            **Stage 4 - Group Chat** (Unlocked after creating 2 characters)
-            - Chat with both characters simultaneously
+            **Stage 4 - Directed Scene** (Unlocked after creating 2 characters)
+            - Watch your whole cast act out a scene together
             - Agents interact with each other and you!
             
             ### 💡 Tips:
-            - You can create up to 2 characters independently
+            - You can create up to {max_characters} characters independently
             - Each character maintains separate chat history
             - Edit appearance anytime without regenerating
             - Use the sidebar navigation hub for quick access
             
             Ready? Fill in the fields and click "Generate Character"!
-            """)
+            """.format(max_characters=config.MAX_CHARACTERS))
 
 
 def _generate_character(char, services, set_current_character):
@@ -125,7 +128,7 @@ def _generate_character(char, services, set_current_character):
     with st.spinner("🎨 Generating character concept..."):
         # Generate prompt and basic info
         creativity = st.session_state.creativity
-        result = services['prompt'].generate_initial_prompts(appearance_str, creativity)
+        result = async_bridge.run(services['prompt'].agenerate_initial_prompts(appearance_str, creativity))
         
         if not result:
             st.error("Failed to generate prompt. Please try again.")
@@ -138,11 +141,11 @@ def _generate_character(char, services, set_current_character):
         
         # Generate image
         with st.spinner("🖼️ Creating character image..."):
-            image_result = services['image'].generate_single_image(char.image_prompts[0])
+            image_result = async_bridge.run(services['image'].agenerate_single_image(char.image_prompts[0]))
             if not image_result:
                 st.error("Failed to generate image. Please try again.")
                 return False
-            char.images_base64 = [image_result['image_base64']]
+            char.image_keys = [image_result['image_key']]
         
         set_current_character(char)
         return True
@@ -2,8 +2,9 @@
 Stage 2: Character Personality - Edit and enhance character personality & backstory
 """
 import streamlit as st
-import base64
 from models.character import Character
+from services import async_bridge
+from services.image_store import load_image
 
 
 def render_stage_2(services, get_current_character, set_current_character, set_current_stage):
@@ -14,8 +15,9 @@ def render_stage_2(services, get_current_character, set_current_character, set_c
     st.markdown(f"*Review and enhance Character {st.session_state.current_character_idx + 1}*")
     
     # Display generated image (if it exists)
-    if char.images_base64 and len(char.images_base64) > 0:
-        st.image(base64.b64decode(char.images_base64[0]), caption="Character Concept", use_container_width=True)
+    image = load_image(char.image_keys[0], "display") if char.image_keys else None
+    if image:
+        st.image(image, caption="Character Concept", use_container_width=True)
         with st.expander("View Prompt"):
             st.code(char.image_prompts[0])
     else:
@@ -113,7 +115,8 @@ def render_stage_2(services, get_current_character, set_current_character, set_c
             st.session_state.current_chat_idx = st.session_state.current_character_idx
             # Initialize chat agent
             char_desc = char.get_full_description()
-            services['agent'].create_agent(char_desc, char.name, idx=st.session_state.current_chat_idx)
+            services['agent'].create_agent(char_desc, char.name, idx=st.session_state.current_chat_idx,
+                                           character_id=char.id)
             set_current_stage(3)
             st.rerun()
 
@@ -124,12 +127,12 @@ def _regenerate_backstory(char, services, set_current_character):
     personality_str = char.personality.to_prompt_string()
     
     with st.spinner("✍️ Creating detailed backstory..."):
-        backstory = services['prompt'].generate_full_backstory(
+        backstory = async_bridge.run(services['prompt'].agenerate_full_backstory(
             appearance_str, 
             personality_str, 
             char.name,
             creativity=st.session_state.get('personality_creativity', 0.7)
-        )
+        ))
         
         if backstory:
             char.personality.backstory = backstory
@@ -2,13 +2,19 @@
 Stage 3: Individual Character Chat - Talk one-on-one with created character
 """
 import streamlit as st
-import base64
+from components.sidebar_navigation import add_character_slot
+from services.image_store import load_image
 
 
 def render_stage_3(services):
     """Render Stage 3: Chat with Individual Character"""
     char = st.session_state.characters[st.session_state.current_chat_idx]
     
+    # Agents are created lazily when switching between characters of the roster
+    if char.name and not services['agent'].has_agent(st.session_state.current_chat_idx):
+        services['agent'].create_agent(char.get_full_description(), char.name,
+                                       idx=st.session_state.current_chat_idx, character_id=char.id)
+    
     # Main layout: chat on left, character info on right
     col_chat, col_info = st.columns([2, 1])
     
@@ -25,19 +31,31 @@ def render_stage_3(services):
                 with st.chat_message(message["role"]):
                     st.markdown(message["content"])
         
+        named = [(idx, other) for idx, other in enumerate(st.session_state.characters) if other.name]
+        everyone = len(named) >= 2 and st.toggle(
+            "📣 Message everyone", key="chat_everyone",
+            help="Every character answers this message at once; each reply goes to that character's chat"
+        )
+        
         # Chat input
-        if prompt := st.chat_input(f"Talk to {char.name}..."):
+        if everyone:
+            if prompt := st.chat_input("Talk to everyone..."):
+                _message_everyone(services, named, prompt)
+        elif prompt := st.chat_input(f"Talk to {char.name}..."):
             # Add user message to history
             st.session_state.chat_history[st.session_state.current_chat_idx].append({"role": "user", "content": prompt})
             
             with st.chat_message("user"):
                 st.markdown(prompt)
             
-            # Get character response
+            # Stream character response into the chat bubble as it arrives
             with st.chat_message("assistant"):
-                with st.spinner(f"{char.name} is thinking..."):
-                    response = services['agent'].chat_with_character(prompt, idx=st.session_state.current_chat_idx)
+                stream = services['agent'].chat_with_character_stream(prompt, idx=st.session_state.current_chat_idx)
+                if stream is None:
+                    response = f"*{char.name} isn't ready to chat yet*"
                     st.markdown(response)
+                else:
+                    response = st.write_stream(stream)
             
             # Add assistant response to history
             st.session_state.chat_history[st.session_state.current_chat_idx].append({"role": "assistant", "content": response})
@@ -46,8 +64,9 @@ def render_stage_3(services):
         st.subheader("📋 Character Info")
         
         # Display character image
-        if char.images_base64:
-            st.image(base64.b64decode(char.images_base64[0]), use_container_width=True)
+        image = load_image(char.image_keys[0], "column") if char.image_keys else None
+        if image:
+            st.image(image, use_container_width=True)
         
         st.markdown("---")
         
@@ -79,29 +98,51 @@ def render_stage_3(services):
             st.rerun()
         
         if st.button("📝 Create/Edit Another"):
-            # Switch to the other character slot
-            st.session_state.current_character_idx = 1 - st.session_state.current_character_idx
-            st.session_state.stages[st.session_state.current_character_idx] = 1
+            # Switch to the first empty slot, adding one if the roster has room
+            characters = st.session_state.characters
+            empty = [idx for idx, other in enumerate(characters) if not other.name]
+            if empty:
+                next_idx = empty[0]
+            else:
+                next_idx = add_character_slot()
+                if next_idx is None:
+                    next_idx = (st.session_state.current_character_idx + 1) % len(characters)
+            st.session_state.current_character_idx = next_idx
+            st.session_state.stages[next_idx] = 1
             st.rerun()
         
         st.markdown("---")
         st.subheader("Available Characters")
-        char1 = st.session_state.characters[0]
-        char2 = st.session_state.characters[1]
         
-        if char1.name:
-            if st.button(f"💬 {char1.name}", use_container_width=True):
-                st.session_state.current_chat_idx = 0
+        for idx, other in named:
+            if st.button(f"💬 {other.name}", key=f"chat_with_{idx}", use_container_width=True):
+                st.session_state.current_chat_idx = idx
                 st.rerun()
         
-        if char2.name:
-            if st.button(f"💬 {char2.name}", use_container_width=True):
-                st.session_state.current_chat_idx = 1
-                st.rerun()
-        
-        # Group chat button if both characters exist
-        if char1.name and char2.name:
+        # Directed scene button once at least two characters exist
+        if len(named) >= 2:
             st.markdown("---")
-            if st.button(f"👥 Group Chat: {char1.name} & {char2.name}", use_container_width=True, type="primary"):
+            cast_names = ", ".join(other.name for _, other in named)
+            if st.button(f"👥 Directed Scene: {cast_names}", use_container_width=True, type="primary"):
                 st.session_state.stages[st.session_state.current_character_idx] = 4
                 st.rerun()
+
+
+def _message_everyone(services, named, prompt):
+    """Send one message to every named character; the replies are requested concurrently"""
+    for idx, other in named:
+        if not services['agent'].has_agent(idx):
+            services['agent'].create_agent(other.get_full_description(), other.name, idx=idx, character_id=other.id)
+    
+    with st.chat_message("user"):
+        st.markdown(prompt)
+    
+    with st.spinner("Everyone is answering..."):
+        replies = services['agent'].group_chat(prompt)
+    
+    for idx, other in named:
+        response = replies.get(idx, f"*{other.name} isn't ready to chat yet*")
+        with st.chat_message("assistant"):
+            st.markdown(f"**{other.name}:** {response}")
+        st.session_state.chat_history[idx].append({"role": "user", "content": prompt})
+        st.session_state.chat_history[idx].append({"role": "assistant", "content": response})
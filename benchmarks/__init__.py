@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the character pipeline.
+
+Run with ``python -m benchmarks.run``; see benchmarks/run.py for options.
+"""
@@ -0,0 +1,215 @@
+"""
+Local stand-in for the OpenAI chat-completions API and the Holara
+generate_image endpoint, with configurable latency and token rates.
+
+Replies are canned but shaped like the real ones (Stage 1 format, director
+JSON, roleplay lines, ...), so every service parses them as in production.
+Holara failures (5xx, 429 with Retry-After, dropped connections) can be
+scripted with FakeBackend.fail_holara().
+"""
+import base64
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+from PIL import Image
+
+from services.conversation_memory import estimate_tokens
+
+DIRECTION = {
+    "prompt_for_character": "Answer them honestly, and let your guard slip a little.",
+    "next_character": "",
+    "narration": "And so the rain softened, as if the city itself were holding its breath between them.",
+    "scene_complete": False,
+}
+LINE = "\"You always say that,\" *folds arms* \"but you never stay long enough to mean it.\""
+
+
+def _reply_for(body: Dict) -> str:
+    """Canned reply matching the prompt that was sent"""
+    system = body["messages"][0]["content"] if body.get("messages") else ""
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+    if "repair malformed" in system:
+        return json.dumps(DIRECTION)
+    if schema == "fused_scene_step" or "ACTORS" in system:
+        return json.dumps({"narration": DIRECTION["narration"], "next_character": "",
+                           "line": LINE, "scene_complete": False})
+    if "STORYTELLER" in system:
+        return json.dumps(DIRECTION)
+    if "prompt engineer" in system:
+        return ("Prompt: a silver-haired fox girl in a rain-soaked neon alley, watercolor and ink, "
+                "soft rim lighting, teal and magenta palette, three-quarter portrait\n"
+                "Name: Kitsune Aoi\n"
+                "Personality: sly, curious and fiercely loyal")
+    if "character development" in system:
+        return " ".join(["Aoi grew up between the lanterns of the old harbor district."] * 24)
+    if "running memory" in system:
+        return "They met in the rain; Aoi teased, the other pushed back, and a promise was left hanging."
+    if "creative director" in system:
+        return "A blackout strands the characters in an old arcade during a storm, with one working machine."
+    return LINE
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend: "FakeBackend" = None
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.path.endswith("/chat/completions"):
+                self._chat(json.loads(raw))
+            else:
+                self._holara(parse_qs(raw.decode()))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up (e.g. a cancelled speculative call)
+
+    def _chat(self, body: Dict):
+        backend = self.backend
+        text = _reply_for(body)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+        tokens = text.split(" ")
+        backend.count(prompt_tokens, len(tokens))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        per_token = 1.0 / backend.tokens_per_second if backend.tokens_per_second else 0.0
+
+        time.sleep(backend.latency)
+        if not body.get("stream"):
+            time.sleep(per_token * len(tokens))
+            self._send_json({"id": "fake", "object": "chat.completion", "created": 0, "model": body.get("model"),
+                             "choices": [{"index": 0, "finish_reason": "stop",
+                                          "message": {"role": "assistant", "content": text}}],
+                             "usage": usage})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            time.sleep(per_token)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": " " + token}
+            self._send_event({"choices": [{"index": 0, "finish_reason": None, "delta": delta}]}, body)
+        self._send_event({"choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}, body)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({"choices": [], "usage": usage}, body)
+        self._send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _holara(self, form: Dict):
+        backend = self.backend
+        backend.count(0, 0)
+        fault, retry_after = backend.next_holara_fault()
+        if fault == "drop":
+            self.close_connection = True  # Hang up without an answer
+            return
+        if fault is not None:
+            data = json.dumps({"status": "error", "detail": f"fake {fault}"}).encode()
+            self.send_response(fault)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if retry_after is not None:
+                self.send_header("Retry-After", retry_after)
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        time.sleep(backend.image_latency)
+        self._send_json({"status": "success", "execution_time": backend.image_latency,
+                         "generation_cost": 1, "hologems_remaining": 999,
+                         "images": [backend.image_base64]})
+
+    def _send_event(self, payload: Dict, body: Dict):
+        payload.update({"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": body.get("model")})
+        self._send_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload: Dict):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeBackend:
+    """Threaded local server; point OPENAI_BASE_URL and HOLARA_API_URL at it"""
+
+    def __init__(self, latency: float = 0.05, tokens_per_second: float = 0.0, image_latency: float = 0.2,
+                 image_size: Tuple[int, int] = (512, 768)):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second  # 0 = the whole reply at once
+        self.image_latency = image_latency
+        self.image_base64 = self._make_image(image_size)
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._holara_faults: List[Union[int, str]] = []
+        self._retry_after: Optional[str] = None
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"backend": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-backend", daemon=True)
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    @property
+    def holara_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/holara/api/external/1.0/generate_image"
+
+    def start(self) -> "FakeBackend":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def fail_holara(self, *faults: Union[int, str], retry_after: Optional[str] = None):
+        """
+        Answer the next Holara requests, one fault each, with an HTTP status
+        (e.g. 503, 429) or "drop" (close the connection unanswered); statuses
+        carry `retry_after` as a Retry-After header when given
+        """
+        with self._lock:
+            self._holara_faults.extend(faults)
+            self._retry_after = retry_after
+
+    def next_holara_fault(self) -> Tuple[Optional[Union[int, str]], Optional[str]]:
+        with self._lock:
+            if not self._holara_faults:
+                return None, None
+            return self._holara_faults.pop(0), self._retry_after
+
+    def stats(self) -> Dict[str, int]:
+        """Requests and tokens served so far"""
+        with self._lock:
+            return {"requests": self.requests, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens}
+
+    @staticmethod
+    def _make_image(size: Tuple[int, int]) -> str:
+        image = Image.new("RGB", size, (40, 60, 90))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode()
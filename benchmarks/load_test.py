@@ -0,0 +1,228 @@
+"""
+Multi-session load test of main.py with Streamlit's AppTest, against benchmarks.fake_backend.
+
+    python -m benchmarks.load_test [--sessions 8] [--concurrency 8] [--scene-steps 10] [--prompt-cache]
+                                   [--latency 0.05] [--tokens-per-second 0] [--image-latency 0.2]
+                                   [--json results.json] [--baseline results.json] [--tolerance 0.2]
+
+Every simulated session walks the whole app in one process, like concurrent
+browser tabs would: two characters through stage 1 -> 2 -> 3, a chat message
+each, then a directed scene in stage 4 that is polled until it has played
+--scene-steps character lines.
+
+AppTest swaps a process-global mock runtime in and out around every run, so
+script runs are serialized on one lock; the time a rerun waits for it is
+reported separately as queueing. Scene steps still run concurrently on the
+sessions' background runners, as they do in the server.
+
+Reports the script time of each kind of rerun (p50/p95), rerun queueing, the
+pickled size of each session's state, and throughput in app interactions and
+scene steps per second. With --baseline, exits with status 1 when a rerun p95 or the session
+state size regresses by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from streamlit import config as st_config
+from streamlit import logger as st_logger
+from streamlit.testing.v1 import AppTest
+
+import config
+from benchmarks.fake_backend import FakeBackend
+from benchmarks.run import configure, peak_rss_mb, regressions, summarize
+
+MAIN = str(Path(__file__).resolve().parent.parent / "main.py")
+SCENE = "The characters are stranded in an arcade during a storm."
+
+_run_lock = threading.Lock()  # AppTest runs share Runtime._instance
+
+
+def state_size(at: AppTest) -> int:
+    """Pickled size in bytes of a session's user state (what a session costs in memory)"""
+    total = 0
+    for value in at.session_state.values():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            total += sys.getsizeof(value)
+    return total
+
+
+class SimulatedUser:
+    """One browser session driven through the whole app"""
+
+    def __init__(self, user_id: int, scene_steps: int, timeout: float):
+        self.user_id = user_id
+        self.scene_steps = scene_steps
+        self.timeout = timeout
+        self.at = AppTest.from_file(MAIN, default_timeout=timeout)
+        self.reruns: Dict[str, List[float]] = defaultdict(list)
+        self.queueing: List[float] = []
+        self.max_state = 0
+        self.steps = 0
+        self.scene_seconds = 0.0
+
+    def play(self) -> "SimulatedUser":
+        self._rerun("open", self.at.run)
+        for n in range(2):
+            self._rerun("edit appearance", self._widget("text_input", "Species").input(f"fox girl {n}").run)
+            self._rerun("generate character", self._button("✨ Generate Character").click().run)
+            self._rerun("start chat", self._button("💬 Chat with Character").click().run)
+            self._rerun("chat message", self.at.chat_input[0].set_value("What brings you here tonight?").run)
+            if n == 0:
+                self._rerun("new character", self._button("📝 Create/Edit Another").click().run)
+
+        self._rerun("open scene", self._button("👥 Directed Scene").click().run)
+        self._rerun("describe scene", self._widget("text_area", "Describe the scene").input(SCENE).run)
+        self._rerun("start scene", self._button("🎬 Start Scene").click().run)
+
+        # The page polls the background runner; rerun at the poll interval until enough lines played
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        while self._scene_steps() < self.scene_steps and time.perf_counter() < deadline:
+            if self.at.session_state["scene_paused"]:
+                break
+            time.sleep(config.SCENE_POLL_INTERVAL)
+            self._rerun("scene poll", self.at.run)
+        self.scene_seconds = time.perf_counter() - start
+        self.steps = self._scene_steps()
+        self._rerun("end scene", self._button("⏹️ End Scene").click().run)
+        return self
+
+    def _scene_steps(self) -> int:
+        return self.at.session_state["scene"].exchange_count
+
+    def _rerun(self, action: str, fn):
+        queued = time.perf_counter()
+        with _run_lock:
+            start = time.perf_counter()
+            fn()
+            self.reruns[action].append(time.perf_counter() - start)
+        self.queueing.append(start - queued)
+        if self.at.exception:
+            raise RuntimeError(f"session {self.user_id} failed on '{action}': {self.at.exception[0].message}")
+        self.max_state = max(self.max_state, state_size(self.at))
+
+    def _button(self, label: str):
+        return self._widget("button", label)
+
+    def _widget(self, kind: str, label: str):
+        for widget in getattr(self.at, kind):
+            if widget.label.startswith(label):
+                return widget
+        raise RuntimeError(f"session {self.user_id}: no {kind} '{label}' on the page")
+
+
+def run(args) -> Dict:
+    users = [SimulatedUser(i, args.scene_steps, args.timeout) for i in range(args.sessions)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="session") as pool:
+        users = list(pool.map(SimulatedUser.play, users))
+    elapsed = time.perf_counter() - start
+
+    reruns: Dict[str, List[float]] = defaultdict(list)
+    for user in users:
+        for action, samples in user.reruns.items():
+            reruns[action].extend(samples)
+    interactions = sum(len(samples) for samples in reruns.values())
+    steps = sum(user.steps for user in users)
+
+    results = {"settings": vars(args).copy(), "latency": {}}
+    results["settings"].pop("baseline", None)
+    results["settings"].pop("json", None)
+    for action, samples in reruns.items():
+        results["latency"][f"rerun: {action}"] = summarize(samples)
+    results["queueing"] = summarize([wait for user in users for wait in user.queueing])
+    results["session_state_kb"] = summarize([user.max_state / 1024 for user in users])
+    results["throughput"] = {
+        "elapsed": elapsed,
+        "interactions_per_second": interactions / elapsed,
+        "scene_steps": steps,
+        "scene_steps_per_second": steps / elapsed,
+        "scene_steps_per_session_second": sum(u.steps / u.scene_seconds for u in users if u.scene_seconds) / len(users),
+    }
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def report(results: Dict):
+    print(f"{'rerun':<28}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, stats in results["latency"].items():
+        print(f"{name[len('rerun: '):]:<28}{stats['n']:>5}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p95'] * 1000:>10.1f}{stats['mean'] * 1000:>10.1f}")
+    queueing = results["queueing"]
+    print(f"{'(queueing for a run)':<28}{queueing['n']:>5}{queueing['p50'] * 1000:>10.1f}"
+          f"{queueing['p95'] * 1000:>10.1f}{queueing['mean'] * 1000:>10.1f}")
+    size = results["session_state_kb"]
+    throughput = results["throughput"]
+    print(f"\nsession state: p50 {size['p50']:.1f} KB, p95 {size['p95']:.1f} KB over {size['n']} sessions")
+    print(f"throughput: {throughput['interactions_per_second']:.1f} interactions/s, "
+          f"{throughput['scene_steps_per_second']:.2f} scene steps/s "
+          f"({throughput['scene_steps_per_session_second']:.2f} per session) in {throughput['elapsed']:.1f} s")
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+
+def state_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    old = baseline.get("session_state_kb")
+    new = results["session_state_kb"]
+    if old and new["p95"] > old["p95"] * (1 + tolerance):
+        return [f"session state p95 {old['p95']:.1f} -> {new['p95']:.1f} KB"]
+    return []
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app")
+    parser.add_argument("--sessions", type=int, default=8, help="simulated browser sessions")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions running at the same time")
+    parser.add_argument("--scene-steps", type=int, default=10, help="character lines to play per scene")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per rerun and per scene")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before each chat reply")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="reply token rate (0 = instant)")
+    parser.add_argument("--image-latency", type=float, default=0.2, help="seconds per Holara image")
+    parser.add_argument("--prompt-cache", action="store_true", help="keep the prompt reply cache on")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (fraction)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Bare-mode and deprecation warnings would be logged on every rerun
+    st_config.set_option("logger.level", "error")
+    st_logger.set_log_level("error")
+    backend = FakeBackend(args.latency, args.tokens_per_second, args.image_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as image_dir, contextlib.redirect_stdout(io.StringIO()):
+            configure(backend, image_dir, args.prompt_cache)
+            results = run(args)
+    finally:
+        backend.stop()
+
+    report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance) + state_regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
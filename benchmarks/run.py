@@ -0,0 +1,194 @@
+"""
+Offline benchmark of the pipeline hot paths against benchmarks.fake_backend.
+
+    python -m benchmarks.run [--latency 0.05] [--tokens-per-second 0] [--image-latency 0.2]
+                             [--iterations 20] [--scene-steps 30] [--cast 2]
+                             [--pipelined] [--fused] [--prompt-cache] [--json results.json]
+                             [--baseline results.json] [--tolerance 0.2]
+
+Reports p50/p95 latency per operation, tokens sent per scene step and the
+process's peak RSS. With --baseline, exits with status 1 when a p95 latency
+or the tokens sent per step regress by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import config
+from benchmarks.fake_backend import FakeBackend
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(samples),
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "mean": sum(samples) / len(samples),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def timed(fn: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def configure(backend: FakeBackend, image_dir: str, prompt_cache: bool = False):
+    """
+    Point every service at the fake backend (before any client is created).
+    The prompt reply cache is off unless asked for, so prompt timings measure the API path.
+    """
+    config.OPENAI_BASE_URL = backend.openai_base_url
+    config.OPENAI_API_KEY = "benchmark"
+    config.HOLARA_API_URL = backend.holara_url
+    config.HOLARA_API_KEY = "benchmark"
+    config.IMAGE_STORE_DIR = image_dir
+    config.CASSETTE_MODE = "off"
+    config.PROMPT_CACHE_DIR = ""
+    if not prompt_cache:
+        config.PROMPT_CACHE_SIZE = 0
+
+
+def run(args, backend: FakeBackend) -> Dict:
+    from models.scene import SceneState
+    from services.agent_service import AgentService, CharacterAgent
+    from services.image_service import ImageGenerationService
+    from services.prompt_service import PromptGenerationService
+
+    prompts = PromptGenerationService()
+    images = ImageGenerationService()
+    appearance = "Species: fox girl; Hair: silver, long; Eyes: amber; Clothing: rain coat; Style: watercolor"
+    description = "Kitsune Aoi, a sly and curious fox girl from the harbor district."
+
+    results: Dict = {"settings": vars(args).copy(), "latency": {}}
+    results["settings"].pop("baseline", None)
+    results["settings"].pop("json", None)
+
+    results["latency"]["generate_initial_prompts"] = summarize(
+        timed(lambda: prompts.generate_initial_prompts(appearance), args.iterations))
+    results["latency"]["generate_image"] = summarize(
+        timed(lambda: images.generate_image("a fox girl in the rain"), args.iterations))
+
+    agent = CharacterAgent(description, "Kitsune Aoi")
+    results["latency"]["character_chat"] = summarize(
+        timed(lambda: agent.chat("What brings you to the harbor tonight?"), args.iterations))
+
+    # The directed scene loop that _advance_scene / the scene runner drive
+    session = AgentService().for_session("benchmark")
+    cast = [(i, f"Character {i + 1}") for i in range(args.cast)]
+    for idx, name in cast:
+        session.create_agent(description, name, idx)
+    scene = SceneState()
+    step_times, step_tokens, step_requests = [], [], []
+    for _ in range(args.scene_steps):
+        before = backend.stats()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            session.scene_step(scene, "The characters are stranded in an arcade during a storm.", cast,
+                               pipelined=args.pipelined, fused=args.fused)
+        step_times.append(time.perf_counter() - start)
+        after = backend.stats()
+        step_tokens.append(after["prompt_tokens"] - before["prompt_tokens"])
+        step_requests.append(after["requests"] - before["requests"])
+    session.close()
+
+    results["latency"]["scene_step"] = summarize(step_times)
+    results["scene"] = {
+        "steps": args.scene_steps,
+        "tokens_sent_per_step": summarize(step_tokens),
+        "requests_per_step": sum(step_requests) / len(step_requests),
+    }
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def report(results: Dict):
+    print(f"{'operation':<28}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, stats in results["latency"].items():
+        print(f"{name:<28}{stats['n']:>5}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p95'] * 1000:>10.1f}{stats['mean'] * 1000:>10.1f}")
+    tokens = results["scene"]["tokens_sent_per_step"]
+    print(f"\ntokens sent per scene step: mean {tokens['mean']:.0f}, p95 {tokens['p95']:.0f} "
+          f"({results['scene']['requests_per_step']:.2f} requests/step)")
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+
+def regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    found = []
+    for name, stats in results["latency"].items():
+        old = baseline.get("latency", {}).get(name)
+        if old and stats["p95"] > old["p95"] * (1 + tolerance):
+            found.append(f"{name} p95 {old['p95'] * 1000:.1f} -> {stats['p95'] * 1000:.1f} ms")
+    old_tokens = baseline.get("scene", {}).get("tokens_sent_per_step")
+    new_tokens = results.get("scene", {}).get("tokens_sent_per_step")
+    if old_tokens and new_tokens and new_tokens["mean"] > old_tokens["mean"] * (1 + tolerance):
+        found.append(f"tokens sent per step {old_tokens['mean']:.0f} -> {new_tokens['mean']:.0f}")
+    return found
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the character pipeline")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before each chat reply")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="reply token rate (0 = instant)")
+    parser.add_argument("--image-latency", type=float, default=0.2, help="seconds per Holara image")
+    parser.add_argument("--iterations", type=int, default=20, help="samples per single-call operation")
+    parser.add_argument("--scene-steps", type=int, default=30)
+    parser.add_argument("--cast", type=int, default=2, help="characters in the scene")
+    parser.add_argument("--pipelined", action="store_true", help="pipelined scene steps")
+    parser.add_argument("--fused", action="store_true", help="fused director+character scene steps")
+    parser.add_argument("--prompt-cache", action="store_true", help="keep the prompt reply cache on")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (fraction)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backend = FakeBackend(args.latency, args.tokens_per_second, args.image_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as image_dir:
+            configure(backend, image_dir, args.prompt_cache)
+            results = run(args, backend)
+    finally:
+        backend.stop()
+
+    report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
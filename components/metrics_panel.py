@@ -0,0 +1,32 @@
+"""
+Sidebar debug panel with per-call latency, token and cost metrics
+"""
+import streamlit as st
+import config
+from services.metrics import get_metrics
+
+
+def render_metrics_panel():
+    """Render the process-wide call metrics (every session's calls) in a sidebar expander"""
+    registry = get_metrics()
+    with st.sidebar.expander("📊 Call Metrics"):
+        rows = registry.summary()
+        if not rows:
+            st.caption("No model or image calls yet")
+        else:
+            st.dataframe(
+                [{key: round(value, 3) if isinstance(value, float) else value for key, value in row.items()}
+                 for row in rows],
+                hide_index=True,
+                use_container_width=True
+            )
+            st.caption("Seconds for `*_seconds`, counts otherwise; p50/p95 are bucket estimates")
+
+        values = registry.values()
+        if values:
+            st.markdown("**Counters & gauges**")
+            for name, value in values.items():
+                st.caption(f"`{name}`: {value:g}")
+
+        if config.METRICS_EXPORTER_PORT:
+            st.caption(f"Prometheus: http://{config.METRICS_EXPORTER_HOST}:{config.METRICS_EXPORTER_PORT}/metrics")
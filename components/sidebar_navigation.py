@@ -2,29 +2,45 @@
 Sidebar navigation and command hub component
 """
 import streamlit as st
+import config
+from models.character import Character
+
+
+def add_character_slot():
+    """Append an empty roster slot and return its index (None when the roster is full)"""
+    if len(st.session_state.characters) >= config.MAX_CHARACTERS:
+        return None
+    st.session_state.characters.append(Character())
+    st.session_state.stages.append(1)
+    st.session_state.chat_history.append([])
+    return len(st.session_state.characters) - 1
 
 
 def render_character_selector(current_idx):
     """Render character selection buttons in sidebar"""
     st.sidebar.markdown("### 👥 Character Selection")
-    char_col1, char_col2 = st.sidebar.columns(2)
+    characters = st.session_state.characters
     
-    with char_col1:
-        if st.button(
-            f"Character 1\n{'✓' if current_idx == 0 else '○'}",
-            use_container_width=True,
-            type="primary" if current_idx == 0 else "secondary"
-        ):
-            st.session_state.current_character_idx = 0
-            st.rerun()
+    # Two buttons per row, however large the roster gets
+    for row_start in range(0, len(characters), 2):
+        cols = st.sidebar.columns(2)
+        for offset, col in enumerate(cols):
+            idx = row_start + offset
+            if idx >= len(characters):
+                break
+            with col:
+                if st.button(
+                    f"Character {idx + 1}\n{'✓' if current_idx == idx else '○'}",
+                    key=f"select_character_{idx}",
+                    use_container_width=True,
+                    type="primary" if current_idx == idx else "secondary"
+                ):
+                    st.session_state.current_character_idx = idx
+                    st.rerun()
     
-    with char_col2:
-        if st.button(
-            f"Character 2\n{'✓' if current_idx == 1 else '○'}",
-            use_container_width=True,
-            type="primary" if current_idx == 1 else "secondary"
-        ):
-            st.session_state.current_character_idx = 1
+    if len(characters) < config.MAX_CHARACTERS:
+        if st.sidebar.button("➕ Add Character", use_container_width=True):
+            st.session_state.current_character_idx = add_character_slot()
             st.rerun()
 
 
@@ -70,8 +86,9 @@ def render_navigation_hub(current_char, current_stage, set_stage_fn, init_chat_f
         set_stage_fn(1)
         st.rerun()
     
-    # Group chat button (only if both characters exist)
-    if current_char.name and st.session_state.characters[1].name:
+    # Directed scene button (only once at least two characters exist)
+    named = [char for char in st.session_state.characters if char.name]
+    if current_char.name and len(named) >= 2:
         if st.button("🎬 Stage 4: Directed Scene", use_container_width=True, type="secondary"):
             set_stage_fn(4)
             st.rerun()
@@ -83,12 +100,11 @@ def render_character_status():
     
     # Character Status
     st.sidebar.caption("📊 **Status**")
-    char1 = st.session_state.characters[0]
-    char2 = st.session_state.characters[1]
-    
-    status1 = "✓ Created" if char1.name else "○ Empty"
-    status2 = "✓ Created" if char2.name else "○ Empty"
-    st.sidebar.caption(f"Char 1: {status1} | Char 2: {status2}")
+    statuses = [
+        f"Char {idx + 1}: {'✓ Created' if char.name else '○ Empty'}"
+        for idx, char in enumerate(st.session_state.characters)
+    ]
+    st.sidebar.caption(" | ".join(statuses))
     
     st.sidebar.markdown("---")
     
@@ -11,18 +11,97 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 HOLARA_API_KEY = os.getenv("HOLARA_API_KEY", "")
 
 # Holara API Configuration
-HOLARA_API_URL = 'https://holara.ai/holara/api/external/1.0/generate_image'
+HOLARA_API_URL = os.getenv("HOLARA_API_URL", 'https://holara.ai/holara/api/external/1.0/generate_image')
 HOLARA_MODEL = 'Aika'
 HOLARA_WIDTH = 768
 HOLARA_HEIGHT = 1152
 HOLARA_STEPS = 30
 HOLARA_CFG_SCALE = 12
+HOLARA_CONNECT_TIMEOUT = float(os.getenv("HOLARA_CONNECT_TIMEOUT", "5"))  # seconds
+HOLARA_READ_TIMEOUT = float(os.getenv("HOLARA_READ_TIMEOUT", "120"))  # seconds
+HOLARA_MAX_RETRIES = int(os.getenv("HOLARA_MAX_RETRIES", "2"))  # retries on 429/5xx/connection errors
+HOLARA_BACKOFF_BASE = float(os.getenv("HOLARA_BACKOFF_BASE", "0.5"))  # seconds, doubled per attempt
+HOLARA_BACKOFF_MAX = float(os.getenv("HOLARA_BACKOFF_MAX", "8"))  # seconds
+HOLARA_POOL_SIZE = int(os.getenv("HOLARA_POOL_SIZE", "10"))  # keep-alive connections
+HOLARA_BREAKER_THRESHOLD = int(os.getenv("HOLARA_BREAKER_THRESHOLD", "5"))  # consecutive failures to open
+HOLARA_BREAKER_RESET = float(os.getenv("HOLARA_BREAKER_RESET", "30"))  # seconds before a trial call
+
+# Generated image storage
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", ".image_store")  # content-addressed image files
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "64"))  # decoded images kept in memory
+IMAGE_VARIANTS = {  # display variant -> max width in pixels
+    "column": 320,
+    "display": 512,
+}
+IMAGE_VARIANT_FORMAT = "WEBP"
+IMAGE_VARIANT_QUALITY = 85
 
 # OpenAI Configuration
 OPENAI_MODEL = "gpt-4"
+AGENT_MODEL = os.getenv("AGENT_MODEL", "gpt-5-mini")  # Director and character agents
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")  # Empty = official API
+
+# Record/replay of OpenAI and Holara traffic (see services/cassette.py)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")  # off | record | replay
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl.gz")
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "0")  # replay delay: seconds, or "recorded"
 MAX_COMPLETION_TOKENS = 1000
 
+# Prompt reply cache (see services/response_cache.py)
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "256"))  # replies kept in memory; 0 = off
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "86400"))  # seconds
+PROMPT_CACHE_MAX_TEMPERATURE = float(os.getenv("PROMPT_CACHE_MAX_TEMPERATURE", "0.5"))  # hotter requests always call the API
+PROMPT_CACHE_TEMPERATURE_STEP = float(os.getenv("PROMPT_CACHE_TEMPERATURE_STEP", "0.1"))  # temperatures sharing a cache entry
+PROMPT_CACHE_DIR = os.getenv("PROMPT_CACHE_DIR", "")  # also persist replies here; empty = memory only
+
+# Structured service logs (see services/log.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG adds (sampled) request/response payloads
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))  # share of debug records kept
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))  # longer field values are truncated
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records waiting to be written before new ones are dropped
+
+# Call metrics (see services/metrics.py)
+METRICS_PANEL = os.getenv("METRICS_PANEL", "false").lower() == "true"  # debug panel in the sidebar
+METRICS_EXPORTER_HOST = os.getenv("METRICS_EXPORTER_HOST", "127.0.0.1")  # loopback only unless changed
+METRICS_EXPORTER_PORT = int(os.getenv("METRICS_EXPORTER_PORT", "0"))  # Prometheus /metrics, e.g. 9464; 0 = off
+
 # Default values
 DEFAULT_CREATIVITY = 0.5
 MIN_CREATIVITY = 0.1
-MAX_CREATIVITY = 1.0
\ No newline at end of file
+MAX_CREATIVITY = 1.0
+
+# Character roster
+DEFAULT_CHARACTER_SLOTS = 2
+MAX_CHARACTERS = int(os.getenv("MAX_CHARACTERS", "8"))
+
+# Agent sessions
+AGENT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "500"))
+AGENT_SESSION_TTL = float(os.getenv("AGENT_SESSION_TTL", "3600"))  # seconds idle before eviction
+
+# Character agent memory
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "8"))  # turns kept verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))  # token budget for verbatim turns
+HISTORY_SUMMARY_EVERY = int(os.getenv("HISTORY_SUMMARY_EVERY", "4"))  # turns between summary refreshes
+HISTORY_MAX_PENDING_TURNS = int(os.getenv("HISTORY_MAX_PENDING_TURNS", "16"))  # unsummarized turns kept if refreshes fail
+
+# Director
+DIRECTOR_FAST_PATH = os.getenv("DIRECTOR_FAST_PATH", "true").lower() == "true"  # skip the model on non-narration turns
+DIRECTOR_STRUCTURED_OUTPUT = os.getenv("DIRECTOR_STRUCTURED_OUTPUT", "true").lower() == "true"  # strict JSON schema (needs provider support)
+DIRECTOR_REPAIR = os.getenv("DIRECTOR_REPAIR", "true").lower() == "true"  # one repair call for an invalid director reply
+DIRECTOR_STREAMING = os.getenv("DIRECTOR_STREAMING", "true").lower() == "true"  # start the character as soon as the cue has streamed in
+SCENE_CONTEXT_WINDOW = int(os.getenv("SCENE_CONTEXT_WINDOW", "12"))  # transcript lines sent verbatim to characters
+SCENE_PIPELINED = os.getenv("SCENE_PIPELINED", "false").lower() == "true"  # default for new scenes: request the next narration beat before the line it follows is written
+SCENE_FUSED = os.getenv("SCENE_FUSED", "false").lower() == "true"  # default for new scenes: one call for narration and line
+SCENE_QUEUE_SIZE = int(os.getenv("SCENE_QUEUE_SIZE", "32"))  # unread scene updates before the runner waits for the page
+SCENE_POLL_INTERVAL = float(os.getenv("SCENE_POLL_INTERVAL", "0.5"))  # seconds between page polls of a playing scene
+SCENE_DISPLAY_WINDOW = int(os.getenv("SCENE_DISPLAY_WINDOW", "30"))  # scene events rendered by default
+
+# Shared HTTP connection pool (OpenAI / LangChain)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))  # seconds
+
+# Group chat: "broadcast" (all reply at once), "lead" (agent 1 first, then the rest together), "chain" (one by one)
+GROUP_CHAT_POLICY = os.getenv("GROUP_CHAT_POLICY", "broadcast")
@@ -2,11 +2,16 @@
 AI Character Creator - Main Application Router
 Refactored for modularity and clean code organization
 """
+import uuid
+
 import streamlit as st
+import config
 from models.character import Character
+from models.scene import SceneState
 from services.prompt_service import PromptGenerationService
 from services.image_service import ImageGenerationService
 from services.agent_service import AgentService
+from services.metrics import start_exporter
 
 # Import stage pages
 from _pages.stage1_appearance import render_stage_1
@@ -20,6 +25,7 @@ from components.sidebar_navigation import (
     render_navigation_hub,
     render_character_status
 )
+from components.metrics_panel import render_metrics_panel
 
 # ==================== PAGE CONFIGURATION ====================
 st.set_page_config(
@@ -32,32 +38,39 @@ st.set_page_config(
 @st.cache_resource
 def get_services():
     """Initialize and cache services"""
+    start_exporter()  # Call metrics for the debug panel and /metrics, once per process
     return {
         'prompt': PromptGenerationService(),
         'image': ImageGenerationService(),
         'agent': AgentService()
     }
 
-services = get_services()
-
 # ==================== SESSION STATE INITIALIZATION ====================
 def initialize_session_state():
     """Initialize all required session state variables"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    # Character roster: one stage, character and chat history per slot
+    slots = config.DEFAULT_CHARACTER_SLOTS
     if 'stages' not in st.session_state:
-        st.session_state.stages = [1, 1]
+        st.session_state.stages = [1] * slots
     if 'characters' not in st.session_state:
-        st.session_state.characters = [Character(), Character()]
+        st.session_state.characters = [Character() for _ in range(slots)]
     if 'current_character_idx' not in st.session_state:
         st.session_state.current_character_idx = 0
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = [[], []]
+        st.session_state.chat_history = [[] for _ in range(slots)]
     if 'current_chat_idx' not in st.session_state:
         st.session_state.current_chat_idx = 0
-    if 'group_chat_history' not in st.session_state:
-        st.session_state.group_chat_history = []
+    if 'scene' not in st.session_state:
+        st.session_state.scene = SceneState()
 
 initialize_session_state()
 
+# Shared services, with the agent registry narrowed down to this session's agents
+services = dict(get_services())
+services['agent'] = services['agent'].for_session(st.session_state.session_id)
+
 # ==================== HELPER FUNCTIONS ====================
 def get_current_stage():
     """Get the current stage for active character"""
@@ -89,7 +102,8 @@ if get_current_stage() in [1, 2]:
         lambda: services['agent'].create_agent(
             get_current_character().get_full_description(),
             get_current_character().name,
-            idx=st.session_state.current_chat_idx
+            idx=st.session_state.current_chat_idx,
+            character_id=get_current_character().id
         ),
         reset_current_character
     )
@@ -109,3 +123,6 @@ elif current_stage == 3:
 
 elif current_stage == 4:
     render_stage_4(services, set_current_stage)
+
+if config.METRICS_PANEL:
+    render_metrics_panel()
@@ -1,6 +1,7 @@
 """
 Character data model
 """
+import uuid
 from dataclasses import dataclass, field
 from typing import Optional, List
 
@@ -64,13 +65,14 @@ class CharacterPersonality:
 @dataclass
 class Character:
     """Complete character data"""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
     appearance: CharacterAppearance = field(default_factory=CharacterAppearance)
     personality: CharacterPersonality = field(default_factory=CharacterPersonality)
     
     # Generated content
     name: str = ""
     image_prompts: List[str] = field(default_factory=list)
-    images_base64: List[str] = field(default_factory=list)
+    image_keys: List[str] = field(default_factory=list)  # Keys into services.image_store
     
     def get_full_description(self) -> str:
         """Get complete character description for agent context"""
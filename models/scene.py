@@ -0,0 +1,136 @@
+"""
+Directed scene data model
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class CastMember(NamedTuple):
+    """A character cast in a scene: routed by `key`, shown by `name`"""
+    slot: int                  # Roster slot of the character's agent
+    name: str
+    id: Optional[str] = None   # Character.id
+
+    @property
+    def key(self) -> str:
+        """Unique within a cast even when names repeat (the slot stands in for a missing id)"""
+        return self.id or f"slot-{self.slot}"
+
+
+@dataclass
+class SceneState:
+    """
+    Incrementally maintained state of a directed scene.
+
+    Events are appended in O(1) and the transcript lines, narration list,
+    speaker counters and last speaker are kept up to date as they are added,
+    so a scene step never has to walk the whole history. The transcript string
+    is joined from the lines when read, at most once per revision.
+    """
+    events: List[Dict] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)       # Transcript lines (dialogue and directions)
+    narrations: List[str] = field(default_factory=list)
+    speakers: List[str] = field(default_factory=list)    # Speaker key (character id) of each dialogue line, in order
+    speaker_counts: Dict[str, int] = field(default_factory=dict)  # Lines per speaker key
+    distinct_speakers: int = 0                           # Characters with at least one line
+    step_starts: List[int] = field(default_factory=list) # Index of the first event of each scene step
+    revision: int = 0                                    # Bumped on every change, including undo
+    _transcript: Tuple[int, str] = field(default=(-1, ""), init=False, repr=False)  # (revision, `lines` joined)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def exchange_count(self) -> int:
+        """Number of character lines spoken so far"""
+        return len(self.speakers)
+
+    @property
+    def last_speaker(self) -> str:
+        return self.speakers[-1] if self.speakers else ""
+
+    @property
+    def transcript(self) -> str:
+        """Scene so far, one line per dialogue line or direction"""
+        revision, text = self._transcript
+        if revision != self.revision:
+            text = "".join(f"{line}\n" for line in self.lines)
+            self._transcript = (self.revision, text)
+        return text
+
+    def has_spoken(self, speaker: str) -> bool:
+        return self.speaker_counts.get(speaker, 0) > 0
+
+    def add_direction(self, content: str):
+        """User interjection or adjustment"""
+        self._drop_empty_steps()  # A direction is not part of the step before it
+        self._append({"role": "user", "content": content})
+
+    def add_narration(self, content: str):
+        """Director narration"""
+        self._append({"role": "director", "content": content})
+
+    def add_line(self, character_name: str, content: str, character_id: str = None):
+        """A character's dialogue line; speakers are told apart by character_id (the name if not given)"""
+        event = {"role": "assistant", "character": character_name, "content": content}
+        if character_id:
+            event["character_id"] = character_id
+        self._append(event)
+
+    def begin_step(self):
+        """Mark where a scene step (narration, if any, then a character line) starts"""
+        self._drop_empty_steps()
+        self.step_starts.append(len(self.events))
+
+    def undo_step(self) -> bool:
+        """Drop the last scene step and anything added after it (used by "Redo Last")"""
+        self._drop_empty_steps()
+        if not self.step_starts:
+            return False
+        self.truncate(self.step_starts[-1])
+        return True
+
+    def truncate(self, length: int):
+        """Drop every event after the first `length` ones"""
+        length = max(length, 0)
+        while len(self.events) > length:
+            self._undo(self.events.pop())
+        while self.step_starts and self.step_starts[-1] >= length:
+            self.step_starts.pop()
+
+    def _drop_empty_steps(self):
+        while self.step_starts and self.step_starts[-1] >= len(self.events):
+            self.step_starts.pop()
+
+    def _append(self, event: Dict):
+        self.revision += 1
+        self.events.append(event)
+        role = event["role"]
+        if role == "director":
+            self.narrations.append(event["content"])
+        elif role == "user":
+            self.lines.append(f"[Direction: {event['content']}]")
+        else:
+            name = event.get("character", "")
+            self.lines.append(f"{name}: \"{event['content']}\"")
+            speaker = event.get("character_id", name)
+            self.speakers.append(speaker)
+            count = self.speaker_counts.get(speaker, 0)
+            if count == 0:
+                self.distinct_speakers += 1
+            self.speaker_counts[speaker] = count + 1
+
+    def _undo(self, event: Dict):
+        self.revision += 1
+        role = event["role"]
+        if role == "director":
+            self.narrations.pop()
+        elif role == "user":
+            self.lines.pop()
+        else:
+            self.lines.pop()
+            speaker = self.speakers.pop()
+            self.speaker_counts[speaker] -= 1
+            if self.speaker_counts[speaker] == 0:
+                self.distinct_speakers -= 1
+
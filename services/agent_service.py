@@ -1,85 +1,150 @@
 """
 Character agent service using modern LangChain (LCEL)
 """
-from typing import Optional, List
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, List, Sequence, Tuple, Union
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.messages import BaseMessage
 
 import config
+from services import async_bridge, telemetry
+from services.conversation_memory import ConversationMemory, estimate_tokens
+from services.json_stream import IncrementalJSONParser
+from services.llm_client import get_chat_model
+from services.log import get_logger
+from services.scene_runner import SceneRunner
+from models.scene import CastMember, SceneState
 
+log = get_logger(__name__)
 
-class DirectorAgent:
-    """Director agent that orchestrates scenes between characters"""
 
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-5-mini",
-            api_key=config.OPENAI_API_KEY,
-        )
-        self.scene_history: List[BaseMessage] = []
+def build_scene_context(lines: Sequence[str], window: int) -> str:
+    """Render the last `window` transcript lines, noting how many earlier ones were left out"""
+    if not lines:
+        return "The scene begins..."
+    recent = lines[-window:] if window > 0 else lines
+    omitted = len(lines) - len(recent)
+    header = f"(... {omitted} earlier lines of the scene ...)\n" if omitted else ""
+    return header + "\n".join(recent)
+
+
+def _consume_exception(task: asyncio.Task):
+    """Mark a background task's exception as retrieved; whoever awaits it handles the error"""
+    if not task.cancelled():
+        task.exception()
+
+
+# Which earlier agents (by slot) each agent waits for before replying in a group chat
+GROUP_CHAT_POLICIES: Dict[str, Callable[[int], List[int]]] = {
+    "broadcast": lambda i: [],              # Everyone answers the user at once
+    "lead": lambda i: [0] if i else [],     # Agent 1 answers, the rest react to it together
+    "chain": lambda i: list(range(i)),      # Each agent sees every earlier reply
+}
+
+
+# Fields of the director's JSON replies, in the order they should be written: name -> (type, required)
+DIRECTION_SCHEMAS: Dict[str, Dict[str, Tuple[type, bool]]] = {
+    "scene_direction": {
+        "prompt_for_character": (str, True),
+        "next_character": (str, False),
+        "narration": (str, True),
+        "scene_complete": (bool, False),
+    },
+    "fused_scene_step": {
+        "narration": (str, True),
+        "next_character": (str, False),
+        "line": (str, True),
+        "scene_complete": (bool, False),
+    },
+}
+
+_JSON_TYPES = {str: "string", bool: "boolean"}
+
+
+def direction_response_format(schema: str) -> dict:
+    """Provider structured-output format (strict JSON schema) for one of DIRECTION_SCHEMAS"""
+    fields = DIRECTION_SCHEMAS[schema]
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": _JSON_TYPES[kind]} for key, (kind, _) in fields.items()},
+                "required": list(fields),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def parse_direction(content: str, schema: str) -> Tuple[Optional[dict], str]:
+    """Validate a director reply against DIRECTION_SCHEMAS; returns (result, "") or (None, problem)"""
+    start, end = content.find("{"), content.rfind("}")
+    if start < 0 or end < start:
+        return None, "no JSON object found"
+    try:
+        result = json.loads(content[start:end + 1])
+    except json.JSONDecodeError as e:
+        return None, f"invalid JSON ({e})"
+    if not isinstance(result, dict):
+        return None, "the reply is not a JSON object"
+    for key, (kind, required) in DIRECTION_SCHEMAS[schema].items():
+        if key not in result:
+            if required:
+                return None, f'missing "{key}"'
+        elif not isinstance(result[key], kind):
+            return None, f'"{key}" must be a {_JSON_TYPES[kind]}'
+    return result, ""
+
+
+@dataclass
+class _DirectionPlan:
+    """Locally decided parts of a scene direction, plus the prompt if the model is needed"""
+    forced_next: str   # Cast entries (ids when the caller passes names)
+    other_char: str
+    forced_name: str   # Their display names
+    other_name: str
+    exchange_count: int
+    needs_narration: bool
+    everyone_spoke: bool
+    schema: str = "scene_direction"  # Key of DIRECTION_SCHEMAS the reply must match
+    messages: Optional[List[BaseMessage]] = None
+    result: Optional[dict] = None  # Set when no model call is needed
 
-    def suggest_scene(self, char1_desc: str, char1_name: str, char2_desc: str, char2_name: str) -> str:
-        """Suggest an interesting scene for the two characters"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a creative director for character interactions. 
-Suggest an interesting, engaging scene for these two characters to act out together.
-Keep the suggestion brief (2-3 sentences) and focus on the setup/situation.
 
-Character 1: {char1_name}
-{char1_desc}
+class DirectorAgent:
+    """Director agent that orchestrates scenes between a cast of characters"""
+
+    # Cues used on turns without narration, rotated by exchange count
+    CUE_TEMPLATES = (
+        "Respond to what {other_char} just said, with emotion.",
+        "React honestly to {other_char} - agree, push back, or change the subject.",
+        "Answer {other_char} and reveal a little more of how you feel.",
+        "Respond to {other_char} and raise the stakes of the conversation.",
+    )
 
-Character 2: {char2_name}
-{char2_desc}
+    # Static instructions first and per-turn data last, so every call shares a cacheable prefix.
+    # The dialogue only grows between steps, so premise + dialogue extends that prefix too.
+    SUGGESTION_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You are a creative director for character interactions. 
+Suggest an interesting, engaging scene for the characters you are given to act out together.
+Keep the suggestion brief (2-3 sentences) and focus on the setup/situation.
 """),
-            ("human", "Suggest an interesting scene for these characters.")
-        ])
-        
-        messages = prompt.format_messages(
-            char1_name=char1_name, char1_desc=char1_desc,
-            char2_name=char2_name, char2_desc=char2_desc
-        )
-        response = self.llm.invoke(messages)
-        return response.content.strip()
+        ("human", """{cast_descriptions}
 
-    def direct_scene(self, scene_instruction: str, char1_name: str, char1_desc: str, 
-                     char2_name: str, char2_desc: str, scene_so_far: str = "", 
-                     char1_spoke: bool = False, char2_spoke: bool = False,
-                     last_speaker: str = "", previous_narrations: list = None) -> dict:
-        """
-        Direct how the scene should unfold. Returns direction for the next interaction.
-        """
-        # FORCE alternation - determine who MUST speak next
-        if last_speaker == char1_name:
-            forced_next = char2_name
-            other_char = char1_name
-        elif last_speaker == char2_name:
-            forced_next = char1_name
-            other_char = char2_name
-        elif char1_spoke and not char2_spoke:
-            forced_next = char2_name
-            other_char = char1_name
-        elif char2_spoke and not char1_spoke:
-            forced_next = char1_name
-            other_char = char2_name
-        else:
-            forced_next = char1_name  # Default: char1 starts
-            other_char = char2_name
-        
-        # Count exchanges to decide on narration frequency
-        exchange_count = len([line for line in scene_so_far.split('\n') if '":' in line or ':"' in line]) if scene_so_far else 0
-        
-        # Narration every 2-3 exchanges, but varied
-        needs_narration = exchange_count == 0 or exchange_count % 3 == 0
-        
-        # Build list of previous narrations to avoid
-        prev_narr_text = ""
-        if previous_narrations and len(previous_narrations) > 0:
-            prev_narr_text = "PREVIOUS NARRATIONS (DO NOT REPEAT THESE):\n- " + "\n- ".join(previous_narrations[-3:])
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a STORYTELLER narrating an unfolding tale between two characters.
+Suggest an interesting scene for these characters.""")
+    ])
+
+    DIRECTION_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You are a STORYTELLER narrating an unfolding tale between a cast of characters.
 
 Your narration style:
 - Write as if you're telling a story to an audience: "And so...", "In that moment...", "The tension between them..."
@@ -89,22 +154,290 @@ Your narration style:
 - Keep it to 1-2 sentences max
 - NEVER repeat the same imagery or phrases from before
 
-{prev_narrations}
+Each turn you receive the scene premise, the dialogue so far, your previous narrations,
+whether narration is needed, and which character to cue next.
 
-Scene premise: {scene_instruction}
+Return ONLY valid JSON, with the keys in this order:
+{{"prompt_for_character": "emotional cue for that character", "next_character": "<character to cue>", "narration": "your storyteller narration here"}}
+"""),
+        ("human", """Scene premise: {scene_instruction}
 
 Dialogue so far:
 {scene_context}
 
+{prev_narrations}
+
 {narration_instruction}
 
-Now cue {forced_next} to respond to {other_char}.
+Now cue {forced_next} to respond to {other_char}. Continue the story - what happens as {forced_next} responds?""")
+    ])
+
+    # Fused mode: one call writes the narration and the cued character's line
+    FUSED_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You are both the STORYTELLER and the ACTORS of an unfolding tale between a cast of characters.
+
+Each turn you write the storyteller's narration (when asked for) and the next line of dialogue,
+spoken by the character you are told to play.
+
+Your narration style:
+- Write as if you're telling a story to an audience: "And so...", "In that moment...", "The tension between them..."
+- Focus on EMOTIONS, TENSION, and the RELATIONSHIP between characters
+- Keep it to 1-2 sentences max
+- NEVER repeat the same imagery or phrases from before
+
+The character's line:
+- Speak AS the character, in their voice and personality, directly TO the character they answer
+- RESPOND to what was just said, and invite a response
+- Keep it brief: 1-3 sentences of dialogue + optional *brief action*
+- Use *asterisks* only for brief physical actions
 
 Return ONLY valid JSON:
-{{"narration": "your storyteller narration here", "next_character": "{forced_next}", "prompt_for_character": "emotional cue for {forced_next}"}}
+{{"narration": "your storyteller narration here", "next_character": "<character speaking>", "line": "the character's dialogue", "scene_complete": false}}
 """),
-            ("human", "Continue the story - what happens as {forced_next} responds?")
-        ])
+        ("human", """Scene premise: {scene_instruction}
+
+Dialogue so far:
+{scene_context}
+
+{prev_narrations}
+
+{narration_instruction}
+
+{forced_next} speaks next, responding to {other_char}. Character sheet of {forced_next}:
+{character_description}""")
+    ])
+
+    # One cheap follow-up call to salvage a reply that does not match its schema
+    REPAIR_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You repair malformed JSON replies.
+Return ONLY a valid JSON object with exactly these keys: {keys}.
+Keep the original wording of every value you can recover; use an empty string for missing text and false for missing flags."""),
+        ("human", """Problem: {problem}
+
+Reply to repair:
+{content}""")
+    ])
+
+    def __init__(self):
+        # Run names label the calls in services.metrics; structured calls are labelled by their schema
+        self.llm = get_chat_model().with_config(run_name="director.suggest_scene")
+        self.direction_llm = self._structured(get_chat_model(), "scene_direction")
+        self.fused_llm = self._structured(get_chat_model(), "fused_scene_step")
+        self.stream_llm = self._structured(get_chat_model(stream_usage=True), "scene_direction")
+        self.scene_history: List[BaseMessage] = []
+        self._cast: Tuple[str, ...] = ()
+        self._cast_index: Dict[str, int] = {}
+
+    @staticmethod
+    def _structured(llm, schema: str):
+        """The model constrained to a direction schema (or to plain JSON if the provider lacks structured output)"""
+        if config.DIRECTOR_STRUCTURED_OUTPUT:
+            return llm.bind(response_format=direction_response_format(schema))
+        return llm.bind(response_format={"type": "json_object"})
+
+    def suggest_scene(self, characters: Sequence[Tuple[str, str]]) -> str:
+        """Suggest an interesting scene for the cast, given as (name, description) pairs"""
+        messages = self._suggestion_messages(characters)
+        response = self.llm.invoke(messages)
+        return response.content.strip()
+
+    async def asuggest_scene(self, characters: Sequence[Tuple[str, str]]) -> str:
+        """Async variant of suggest_scene"""
+        messages = self._suggestion_messages(characters)
+        response = await self.llm.ainvoke(messages)
+        return response.content.strip()
+
+    def _suggestion_messages(self, characters: Sequence[Tuple[str, str]]) -> List[BaseMessage]:
+        cast_descriptions = "\n\n".join(
+            f"Character {i}: {name}\n{desc}" for i, (name, desc) in enumerate(characters, start=1)
+        )
+        return self.SUGGESTION_PROMPT.format_messages(cast_descriptions=cast_descriptions)
+
+    def direct_scene(self, scene_instruction: str, cast: Sequence[str], scene_so_far: str = "",
+                     last_speaker: str = "", previous_narrations: list = None,
+                     exchange_count: Optional[int] = None, everyone_spoke: bool = False,
+                     names: Dict[str, str] = None) -> dict:
+        """
+        Direct how the scene should unfold. Returns direction for the next interaction.
+
+        cast is the ordered list of character names; turns rotate through it.
+        To tell apart characters that share a name, pass their ids as cast and
+        last_speaker instead, with names mapping each id to the name shown in
+        the prompt; next_character and respond_to are then ids as well.
+        Pass exchange_count when it is already known to avoid re-scanning scene_so_far.
+        """
+        plan = self._plan_direction(
+            scene_instruction, cast, scene_so_far, last_speaker,
+            previous_narrations, exchange_count, everyone_spoke, names
+        )
+        if plan.result is not None:
+            return plan.result
+        
+        response = self.direction_llm.invoke(plan.messages)
+        return self._finish_direction(response.content, plan)
+
+    async def adirect_scene(self, scene_instruction: str, cast: Sequence[str], scene_so_far: str = "",
+                            last_speaker: str = "", previous_narrations: list = None,
+                            exchange_count: Optional[int] = None, everyone_spoke: bool = False,
+                            names: Dict[str, str] = None) -> dict:
+        """Async variant of direct_scene"""
+        plan = self._plan_direction(
+            scene_instruction, cast, scene_so_far, last_speaker,
+            previous_narrations, exchange_count, everyone_spoke, names
+        )
+        if plan.result is not None:
+            return plan.result
+        
+        response = await self.direction_llm.ainvoke(plan.messages)
+        return await self._afinish_direction(response.content, plan)
+
+    async def adirect_scene_streaming(self, scene_instruction: str, cast: Sequence[str], scene_so_far: str = "",
+                                      last_speaker: str = "", previous_narrations: list = None,
+                                      exchange_count: Optional[int] = None, everyone_spoke: bool = False,
+                                      names: Dict[str, str] = None, on_cue: Callable[[str], None] = None,
+                                      on_narration: Callable[[str], None] = None) -> dict:
+        """
+        Streaming variant of adirect_scene. The reply is parsed as it arrives:
+        on_cue receives prompt_for_character as soon as it is complete (the
+        prompt asks for it first), so the character can start replying while
+        the rest streams; on_narration receives the narration written so far.
+        """
+        plan = self._plan_direction(
+            scene_instruction, cast, scene_so_far, last_speaker,
+            previous_narrations, exchange_count, everyone_spoke, names
+        )
+        if plan.result is not None:
+            if on_cue:
+                on_cue(plan.result["prompt_for_character"])
+            return plan.result
+
+        parser = IncrementalJSONParser()
+        parts = []
+        async for chunk in self.stream_llm.astream(plan.messages):
+            if not chunk.content:
+                continue
+            parts.append(chunk.content)
+            if parser is None:
+                continue  # Buffer the rest for _afinish_direction
+            try:
+                completed = parser.feed(chunk.content)
+            except ValueError as e:
+                # Malformed so far: stop dispatching early and let the full reply be parsed (and repaired)
+                telemetry.count("director.stream_parse_failures")
+                log.warning("director.stream_parse_failed", error=str(e))
+                parser = None
+                continue
+            for key in completed:
+                if key == "prompt_for_character" and on_cue:
+                    on_cue(str(parser.fields[key]))
+            if on_narration and plan.needs_narration:
+                narration = parser.partial if parser.key == "narration" else parser.fields.get("narration")
+                if narration:
+                    on_narration(narration)
+
+        return await self._afinish_direction("".join(parts), plan)
+
+    def direct_scene_fused(self, scene_instruction: str, cast: Sequence[str], character_description: str,
+                           scene_so_far: str = "", last_speaker: str = "", previous_narrations: list = None,
+                           exchange_count: Optional[int] = None, everyone_spoke: bool = False,
+                           names: Dict[str, str] = None) -> dict:
+        """
+        Like direct_scene, but one call also writes the cued character's line,
+        returned under "line". character_description is the sheet of the
+        character cued next (see next_speaker). Turns that need no narration
+        are directed locally and come back without a line, as in direct_scene.
+        """
+        plan = self._plan_direction(
+            scene_instruction, cast, scene_so_far, last_speaker, previous_narrations,
+            exchange_count, everyone_spoke, names, self.FUSED_PROMPT, character_description=character_description
+        )
+        if plan.result is not None:
+            return plan.result
+        plan.schema = "fused_scene_step"
+
+        response = self.fused_llm.invoke(plan.messages)
+        return self._finish_direction(response.content, plan)
+
+    async def adirect_scene_fused(self, scene_instruction: str, cast: Sequence[str], character_description: str,
+                                  scene_so_far: str = "", last_speaker: str = "", previous_narrations: list = None,
+                                  exchange_count: Optional[int] = None, everyone_spoke: bool = False,
+                                  names: Dict[str, str] = None) -> dict:
+        """Async variant of direct_scene_fused"""
+        plan = self._plan_direction(
+            scene_instruction, cast, scene_so_far, last_speaker, previous_narrations,
+            exchange_count, everyone_spoke, names, self.FUSED_PROMPT, character_description=character_description
+        )
+        if plan.result is not None:
+            return plan.result
+        plan.schema = "fused_scene_step"
+
+        response = await self.fused_llm.ainvoke(plan.messages)
+        return await self._afinish_direction(response.content, plan)
+
+    def next_speaker(self, cast: Sequence[str], last_speaker: str) -> Tuple[str, str]:
+        """
+        Who MUST speak next and whom they answer: turns rotate through the cast
+        in order, starting with the first member. The cost does not grow with the
+        scene: it is O(cast size), for comparing the cast with the cached index.
+        """
+        cast = tuple(cast)
+        if cast != self._cast:
+            self._cast = cast
+            self._cast_index = {member: i for i, member in enumerate(cast)}
+        last_idx = self._cast_index.get(last_speaker)
+        if last_idx is None:
+            # Nobody has spoken yet: the first member opens, addressing the second
+            return cast[0], cast[1 % len(cast)]
+        return cast[(last_idx + 1) % len(cast)], last_speaker
+
+    @staticmethod
+    def needs_narration(exchange_count: int) -> bool:
+        """Narration beats: the opening and every third exchange"""
+        return exchange_count == 0 or exchange_count % 3 == 0
+
+    def needs_model(self, exchange_count: int) -> bool:
+        """Whether the direction after `exchange_count` lines calls the model (else it is decided locally)"""
+        return self.needs_narration(exchange_count) or not config.DIRECTOR_FAST_PATH
+
+    def _plan_direction(self, scene_instruction: str, cast: Sequence[str], scene_so_far: str,
+                        last_speaker: str, previous_narrations: Optional[list],
+                        exchange_count: Optional[int], everyone_spoke: bool, names: Optional[Dict[str, str]],
+                        prompt: ChatPromptTemplate = None, **prompt_vars) -> _DirectionPlan:
+        """
+        Decide the next speaker and narration locally; build the model prompt if one is needed.
+        prompt defaults to DIRECTION_PROMPT; prompt_vars fill any extra variables it has.
+        """
+        # FORCE rotation - determine who MUST speak next
+        forced_next, other_char = self.next_speaker(cast, last_speaker)
+        names = names or {}
+        forced_name, other_name = names.get(forced_next, forced_next), names.get(other_char, other_char)
+        
+        # Count exchanges to decide on narration frequency
+        if exchange_count is None:
+            exchange_count = len([line for line in scene_so_far.split('\n') if ': "' in line]) if scene_so_far else 0
+        
+        # Narration every 2-3 exchanges, but varied
+        needs_narration = self.needs_narration(exchange_count)
+        
+        plan = _DirectionPlan(
+            forced_next=forced_next,
+            other_char=other_char,
+            forced_name=forced_name,
+            other_name=other_name,
+            exchange_count=exchange_count,
+            needs_narration=needs_narration,
+            everyone_spoke=everyone_spoke,
+        )
+        
+        # Fast path: the narration would be discarded anyway, so cue the character locally
+        if not needs_narration and config.DIRECTOR_FAST_PATH:
+            plan.result = self._local_direction(plan)
+            return plan
+        
+        # Build list of previous narrations to avoid
+        prev_narr_text = ""
+        if previous_narrations and len(previous_narrations) > 0:
+            prev_narr_text = "PREVIOUS NARRATIONS (DO NOT REPEAT THESE):\n- " + "\n- ".join(previous_narrations[-3:])
         
         if needs_narration:
             narration_instruction = "Write a storyteller-style narration that advances the emotional beat of the scene. Focus on something NEW - a gesture, a feeling, a shift in energy."
@@ -113,50 +446,108 @@ Return ONLY valid JSON:
         
         scene_context = scene_so_far if scene_so_far else "The scene begins..."
         
-        messages = prompt.format_messages(
+        plan.messages = (prompt or self.DIRECTION_PROMPT).format_messages(
             scene_instruction=scene_instruction,
             scene_context=scene_context,
-            forced_next=forced_next,
-            other_char=other_char,
+            forced_next=forced_name,
+            other_char=other_name,
             narration_instruction=narration_instruction,
-            prev_narrations=prev_narr_text
+            prev_narrations=prev_narr_text,
+            **prompt_vars
         )
-        
-        response = self.llm.invoke(messages)
-        
-        # Parse JSON response
-        import json
-        import re
-        
-        # Try to extract JSON from response
-        content = response.content.strip()
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'```\s*', '', content)
-        
+        return plan
+
+    def _finish_direction(self, content: str, plan: _DirectionPlan) -> dict:
+        """Validate the director's reply (repairing it once if needed) and enforce the local rules"""
+        result, problem = parse_direction(content, plan.schema)
+        if result is None:
+            result = self._repair(content, problem, plan)
+        return self._apply_rules(result, plan)
+
+    async def _afinish_direction(self, content: str, plan: _DirectionPlan) -> dict:
+        """Async variant of _finish_direction"""
+        result, problem = parse_direction(content, plan.schema)
+        if result is None:
+            result = await self._arepair(content, problem, plan)
+        return self._apply_rules(result, plan)
+
+    def _repair(self, content: str, problem: str, plan: _DirectionPlan) -> dict:
+        messages = self._repair_messages(content, problem, plan)
+        if messages is None:
+            return {}
         try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
-            result = {}
-        
+            response = self._schema_llm(plan).invoke(messages)
+        except Exception as e:
+            log.error("director.repair_failed", error=str(e))
+            return self._repaired(None, plan)
+        return self._repaired(response.content, plan)
+
+    async def _arepair(self, content: str, problem: str, plan: _DirectionPlan) -> dict:
+        messages = self._repair_messages(content, problem, plan)
+        if messages is None:
+            return {}
+        try:
+            response = await self._schema_llm(plan).ainvoke(messages)
+        except Exception as e:
+            log.error("director.repair_failed", error=str(e))
+            return self._repaired(None, plan)
+        return self._repaired(response.content, plan)
+
+    def _repair_messages(self, content: str, problem: str, plan: _DirectionPlan) -> Optional[List[BaseMessage]]:
+        """Count the parse failure; the repair prompt, or None when repairs are disabled"""
+        telemetry.count("director.parse_failures", schema=plan.schema, problem=problem)
+        if not config.DIRECTOR_REPAIR:
+            telemetry.count("director.fallbacks", schema=plan.schema)
+            return None
+        return self.REPAIR_PROMPT.format_messages(
+            keys=", ".join(DIRECTION_SCHEMAS[plan.schema]), problem=problem, content=content
+        )
+
+    def _repaired(self, content: Optional[str], plan: _DirectionPlan) -> dict:
+        """Result of the single repair attempt; an empty direction (defaults) if it failed too"""
+        telemetry.count("director.repairs", schema=plan.schema)
+        result, _ = parse_direction(content, plan.schema) if content else (None, "")
+        if result is None:
+            telemetry.count("director.fallbacks", schema=plan.schema)
+            return {}
+        return result
+
+    def _schema_llm(self, plan: _DirectionPlan):
+        return self.fused_llm if plan.schema == "fused_scene_step" else self.direction_llm
+
+    def _apply_rules(self, result: dict, plan: _DirectionPlan) -> dict:
+        """Enforce the locally decided rules on a parsed direction"""
         # FORCE the correct next character
-        result["next_character"] = forced_next
+        result["next_character"] = plan.forced_next
+        result["respond_to"] = plan.other_char
         
         # Ensure all keys exist
         if "narration" not in result:
             result["narration"] = ""
-        if not needs_narration:
+        if not plan.needs_narration:
             result["narration"] = ""
         if "prompt_for_character" not in result:
-            result["prompt_for_character"] = f"Respond to {other_char} with emotion."
+            result["prompt_for_character"] = f"Respond to {plan.other_name} with emotion."
         if "scene_complete" not in result:
             result["scene_complete"] = False
         
         # Don't allow scene to complete until enough exchanges
-        if exchange_count < 6 or not (char1_spoke and char2_spoke):
+        if plan.exchange_count < 6 or not plan.everyone_spoke:
             result["scene_complete"] = False
             
         return result
 
+    def _local_direction(self, plan: _DirectionPlan) -> dict:
+        """Build a non-narration direction without calling the model"""
+        template = self.CUE_TEMPLATES[plan.exchange_count % len(self.CUE_TEMPLATES)]
+        return {
+            "narration": "",
+            "next_character": plan.forced_next,
+            "respond_to": plan.other_char,
+            "prompt_for_character": template.format(other_char=plan.other_name),
+            "scene_complete": False,
+        }
+
     def reset(self):
         """Reset the director's scene history"""
         self.scene_history = []
@@ -165,15 +556,43 @@ Return ONLY valid JSON:
 class CharacterAgent:
     """Conversational agent that roleplays as the created character"""
 
+    # The system message only depends on the character, so it is a byte-identical
+    # prefix for every scene call; the partner and scene so far come last.
+    SCENE_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You are roleplaying as the following character in a directed scene WITH OTHER CHARACTERS.
+
+{character_description}
+
+You are: {character_name}
+
+CRITICAL DIALOGUE INSTRUCTIONS:
+- You are having a CONVERSATION with the character you are interacting with - speak TO them directly
+- If they just said something, RESPOND to what they said
+- Use their name naturally in your dialogue when appropriate
+- Show your character's personality through HOW you talk to them
+- Express emotions, reactions, and opinions about what they say/do
+- Keep response brief: 1-3 sentences of dialogue + optional *brief action*
+- Your dialogue should invite a response
+
+FORMAT: Speak as your character. Use *asterisks* only for brief physical actions.
+Example: "That's ridiculous!" *crosses arms* "You can't possibly believe that."
+"""),
+        ("placeholder", "{history}"),
+        ("human", """You are interacting with: {other_char_name}
+
+SCENE SO FAR:
+{scene_context}
+
+Director's cue: {direction}""")
+    ])
+
     def __init__(self, character_description: str, character_name: str):
         self.character_name = character_name
         self.character_description = character_description
-        self.history: List[BaseMessage] = []
 
-        self.llm = ChatOpenAI(
-            model="gpt-5-mini",
-            api_key=config.OPENAI_API_KEY,
-        )
+        self.llm = get_chat_model(stream_usage=True).with_config(run_name="character")
+        self.memory = ConversationMemory(get_chat_model(stream_usage=True).with_config(run_name="character.summary"),
+                                         ai_name=character_name)
 
         self.prompt = ChatPromptTemplate.from_messages(
             [
@@ -198,96 +617,165 @@ You are: {character_name}
             ]
         )
     
-    def scene_response(self, direction: str, other_char_name: str, scene_context: str) -> str:
-        """Respond to a director's scene direction"""
-        scene_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are roleplaying as the following character in a directed scene WITH ANOTHER CHARACTER.
-
-{character_description}
+    def scene_response(self, direction: str, other_char_name: str,
+                       scene_context: Union[str, Sequence[str]], window: int = None) -> str:
+        """
+        Respond to a director's scene direction.
 
-You are: {character_name}
-You are interacting with: {other_char_name}
+        scene_context is the scene transcript (a string or its list of lines).
+        Every scene event is sent once: only the last `window` transcript lines
+        go in verbatim, and the agent's own scene turns are not replayed from
+        history since they are already part of the transcript.
+        """
+        messages = self._scene_messages(direction, other_char_name, scene_context, window)
+        response = self.llm.invoke(messages)
+        # The scene prompt carries its own transcript, so scene turns never start a summary call
+        self.memory.add_turn(direction, response.content, summarize=False)
+        
+        return response.content.strip()
 
-SCENE SO FAR:
-{scene_context}
+    async def ascene_response(self, direction: str, other_char_name: str,
+                              scene_context: Union[str, Sequence[str]], window: int = None) -> str:
+        """Async variant of scene_response"""
+        messages = self._scene_messages(direction, other_char_name, scene_context, window)
+        response = await self.llm.ainvoke(messages)
+        await self.memory.aadd_turn(direction, response.content, summarize=False)
+        
+        return response.content.strip()
 
-CRITICAL DIALOGUE INSTRUCTIONS:
-- You are having a CONVERSATION with {other_char_name} - speak TO them directly
-- If they just said something, RESPOND to what they said
-- Use their name naturally in your dialogue when appropriate
-- Show your character's personality through HOW you talk to them
-- Express emotions, reactions, and opinions about what {other_char_name} says/does
-- Keep response brief: 1-3 sentences of dialogue + optional *brief action*
-- Your dialogue should invite a response from {other_char_name}
+    def _scene_messages(self, direction: str, other_char_name: str,
+                        scene_context: Union[str, Sequence[str]], window: Optional[int]) -> List[BaseMessage]:
+        """Build the scene prompt, reporting its size against the undeduplicated layout"""
+        lines = scene_context.splitlines() if isinstance(scene_context, str) else scene_context
+        window = window or config.SCENE_CONTEXT_WINDOW
 
-FORMAT: Speak as your character. Use *asterisks* only for brief physical actions.
-Example: "That's ridiculous!" *crosses arms* "You can't possibly believe that, {other_char_name}."
-"""),
-            ("placeholder", "{history}"),
-            ("human", "Director's cue: {direction}")
-        ])
-        
-        messages = scene_prompt.format_messages(
+        messages = self.SCENE_PROMPT.format_messages(
             character_description=self.character_description,
             character_name=self.character_name,
             other_char_name=other_char_name,
-            scene_context=scene_context,
-            history=self.history,
+            scene_context=build_scene_context(lines, window),
+            history=self.memory.summary_messages(),
             direction=direction
         )
-        
-        response = self.llm.invoke(messages)
-        self.history.append(HumanMessage(content=direction))
-        self.history.append(AIMessage(content=response.content))
-        
-        return response.content.strip()
+        if telemetry.has_hooks():
+            # What the prompt used to cost: full transcript plus the full history
+            naive = (
+                estimate_tokens("\n".join(lines))
+                + sum(estimate_tokens(m.content) for m in self.memory.messages())
+            )
+            sent = sum(estimate_tokens(m.content) for m in messages)
+            base = sum(estimate_tokens(m.content) for m in messages[:1])
+            telemetry.emit("scene_prompt_tokens", character=self.character_name,
+                           before=base + naive, after=sent)
+        return messages
+
+    def _chat_messages(self, user_message: str) -> List[BaseMessage]:
+        # Monta mensagens
+        return self.prompt.format_messages(
+            character_description=self.character_description,
+            character_name=self.character_name,
+            history=self.memory.messages(),
+            input=user_message,
+        )
 
     def chat(self, user_message: str) -> str:
         """Send a message to the character and get a response"""
         try:
-            # Monta mensagens
-            messages = self.prompt.format_messages(
-                character_description=self.character_description,
-                character_name=self.character_name,
-                history=self.history,
-                input=user_message,
-            )
+            messages = self._chat_messages(user_message)
 
             # Chamada do modelo
             response = self.llm.invoke(messages)
 
             # Atualiza histórico
-            self.history.append(HumanMessage(content=user_message))
-            self.history.append(AIMessage(content=response.content))
+            self.memory.add_turn(user_message, response.content)
 
             return response.content.strip()
 
         except Exception as e:
-            print(f"Error in character conversation: {e}")
+            log.error("character.chat_failed", character=self.character_name, error=str(e))
             return f"*{self.character_name} seems distracted and didn't respond*"
 
+    async def achat(self, user_message: str) -> str:
+        """Async variant of chat"""
+        try:
+            messages = self._chat_messages(user_message)
+            response = await self.llm.ainvoke(messages)
+            await self.memory.aadd_turn(user_message, response.content)
+            return response.content.strip()
+
+        except Exception as e:
+            log.error("character.chat_failed", character=self.character_name, error=str(e))
+            return f"*{self.character_name} seems distracted and didn't respond*"
+
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Stream the character's response token by token.
+        The turn is only added to the history once the stream completes.
+        """
+        messages = self._chat_messages(user_message)
+
+        parts = []
+        try:
+            for chunk in self.llm.stream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+        except Exception as e:
+            log.error("character.chat_failed", character=self.character_name, error=str(e))
+            if not parts:
+                yield f"*{self.character_name} seems distracted and didn't respond*"
+            return
+
+        self.memory.add_turn(user_message, "".join(parts))
+
     def reset_conversation(self):
         """Clear conversation history"""
-        self.history = []
+        self.memory.clear()
 
     def get_conversation_history(self) -> List[BaseMessage]:
-        """Get the full conversation history"""
-        return self.history
+        """Get the history as sent to the model (summary + recent turns)"""
+        return self.memory.messages()
 
 
 
-class AgentService:
-    """Service for managing one or more character agents"""
+class AgentSession:
+    """Character agents and director belonging to a single browser session"""
 
-    def __init__(self):
-        self.agents: list[Optional[CharacterAgent]] = [None, None]
+    def __init__(self, on_touch: Callable[["AgentSession"], None] = None):
+        self.agents: list[Optional[CharacterAgent]] = []  # One slot per roster position
         self.director: Optional[DirectorAgent] = None
+        self.last_access = time.monotonic()
+        self._on_touch = on_touch  # Lets the owning AgentService refresh its LRU order
+        self._slots_by_id: Dict[str, int] = {}
+        # Director cue requested ahead of time for the next scene step, with the scene state it assumes
+        self._speculation: Optional[Tuple[tuple, asyncio.Task]] = None
+        self.scene_runner: Optional[SceneRunner] = None
+
+    def touch(self):
+        """Mark the session as recently used, e.g. from a page fragment that reruns on its own"""
+        self.last_access = time.monotonic()
+        if self._on_touch:
+            self._on_touch(self)
 
-    def create_agent(self, character_description: str, character_name: str, idx: int = 0) -> CharacterAgent:
+    def create_agent(self, character_description: str, character_name: str, idx: int = 0,
+                     character_id: str = None) -> CharacterAgent:
         agent = CharacterAgent(character_description, character_name)
+        if idx >= len(self.agents):
+            self.agents.extend([None] * (idx + 1 - len(self.agents)))
         self.agents[idx] = agent
+        if character_id:
+            self._slots_by_id[character_id] = idx
         return agent
 
+    def get_agent(self, idx: int) -> Optional[CharacterAgent]:
+        """Agent in a roster slot, or None if the slot is empty"""
+        return self.agents[idx] if 0 <= idx < len(self.agents) else None
+
+    def get_agent_by_id(self, character_id: str) -> Optional[CharacterAgent]:
+        """Agent created for a Character.id"""
+        idx = self._slots_by_id.get(character_id)
+        return None if idx is None else self.get_agent(idx)
+
     def create_director(self) -> DirectorAgent:
         """Create or get the director agent"""
         if not self.director:
@@ -299,49 +787,382 @@ class AgentService:
         return self.director
 
     def chat_with_character(self, message: str, idx: int = 0) -> Optional[str]:
-        agent = self.agents[idx]
+        agent = self.get_agent(idx)
         if not agent:
             return None
         return agent.chat(message)
 
-    def scene_response(self, direction: str, idx: int, other_char_name: str, scene_context: str) -> Optional[str]:
+    def chat_with_character_stream(self, message: str, idx: int = 0) -> Optional[Iterator[str]]:
+        """Stream a character's reply; returns None if the agent does not exist"""
+        agent = self.get_agent(idx)
+        if not agent:
+            return None
+        return agent.chat_stream(message)
+
+    def scene_response(self, direction: str, idx: int, other_char_name: str,
+                       scene_context: Union[str, Sequence[str]]) -> Optional[str]:
         """Get a character's response to a director's scene direction"""
-        agent = self.agents[idx]
+        agent = self.get_agent(idx)
         if not agent:
             return None
         return agent.scene_response(direction, other_char_name, scene_context)
 
+    async def achat_with_character(self, message: str, idx: int = 0) -> Optional[str]:
+        """Async variant of chat_with_character"""
+        agent = self.get_agent(idx)
+        if not agent:
+            return None
+        return await agent.achat(message)
+
+    async def ascene_response(self, direction: str, idx: int, other_char_name: str,
+                              scene_context: Union[str, Sequence[str]]) -> Optional[str]:
+        """Async variant of scene_response"""
+        agent = self.get_agent(idx)
+        if not agent:
+            return None
+        return await agent.ascene_response(direction, other_char_name, scene_context)
+
     def reset_agent(self, idx: int = None):
         if idx is None:
             for agent in self.agents:
                 if agent:
                     agent.reset_conversation()
-            if self.director:
-                self.director.reset()
+            self.reset_director()
         else:
-            if self.agents[idx]:
-                self.agents[idx].reset_conversation()
+            agent = self.get_agent(idx)
+            if agent:
+                agent.reset_conversation()
 
     def reset_director(self):
         """Reset only the director's scene history"""
+        self._drop_speculation()
         if self.director:
             self.director.reset()
 
     def has_agent(self, idx: int = 0) -> bool:
-        return self.agents[idx] is not None
+        return self.get_agent(idx) is not None
+
+    def start_scene(self, scene: SceneState, scene_instruction: str, cast: Sequence[CastMember],
+                    pipelined: bool = False, fused: bool = False, playing: bool = True) -> SceneRunner:
+        """Play a scene on a background runner, replacing any previous one"""
+        self.stop_scene()
+        self.scene_runner = SceneRunner(self, scene, scene_instruction, cast, pipelined, fused)
+        return self.scene_runner.start(playing)
+
+    def get_scene_runner(self) -> Optional[SceneRunner]:
+        return self.scene_runner
+
+    def stop_scene(self):
+        if self.scene_runner:
+            self.scene_runner.stop()
+            self.scene_runner = None
+
+    def close(self):
+        """Release background work held by the session"""
+        self.stop_scene()
+        self._drop_speculation()
+
+    def scene_step(self, scene: SceneState, scene_instruction: str, cast: Sequence[CastMember],
+                   pipelined: bool = False, fused: bool = False, streaming: bool = None,
+                   on_narration: Callable[[str], None] = None) -> dict:
+        """
+        Advance a directed scene by one interaction: the director's cue, then the
+        cued character's line. cast holds CastMember (slot, name, character id)
+        tuples in speaking order; turns are routed by id, names are only shown.
+        Returns the direction that was followed.
+
+        With pipelined=True the director's cue for the following step is requested
+        while the character is still replying, and used by the next call if the
+        scene has not changed in between (otherwise it is discarded).
+
+        With fused=True the director writes the character's line in the same call
+        (see DirectorAgent.direct_scene_fused); there is nothing to pipeline then.
+
+        With streaming (default DIRECTOR_STREAMING) the character starts replying
+        as soon as the director's cue has streamed in; on_narration receives the
+        narration while it is still being written.
+        """
+        return async_bridge.run(self.ascene_step(
+            scene, scene_instruction, cast, pipelined, fused, streaming, on_narration
+        ))
+
+    async def ascene_step(self, scene: SceneState, scene_instruction: str, cast: Sequence[CastMember],
+                          pipelined: bool = False, fused: bool = False, streaming: bool = None,
+                          on_narration: Callable[[str], None] = None) -> dict:
+        """Async variant of scene_step"""
+        scene.begin_step()
+        director = self.create_director()
+        members = [CastMember(*member) for member in cast]
+        keys = [member.key for member in members]
+        names = {member.key: member.name for member in members}
+        slots = {member.key: member.slot for member in members}
+        if fused:
+            return await self._afused_scene_step(director, scene, scene_instruction, keys, names, slots)
+
+        reply = None
+        direction = await self._take_speculation(self._scene_key(scene, scene_instruction, keys))
+        if direction is None and (config.DIRECTOR_STREAMING if streaming is None else streaming):
+            direction, reply = await self._astream_direction(
+                director, scene, scene_instruction, keys, names, slots, on_narration
+            )
+        elif direction is None:
+            direction = await director.adirect_scene(
+                scene_instruction, keys, scene.transcript,
+                last_speaker=scene.last_speaker,
+                previous_narrations=scene.narrations,
+                exchange_count=scene.exchange_count,
+                everyone_spoke=scene.distinct_speakers >= len(keys),
+                names=names,
+            )
+
+        # Add director narration only if it's meaningful and not empty
+        narration = direction.get("narration", "").strip()
+        if narration and len(narration) > 3:
+            scene.add_narration(narration)
+
+        speaker = direction.get("next_character")
+        other = direction.get("respond_to")
+        if speaker not in slots or other not in slots:
+            speaker, other = director.next_speaker(keys, scene.last_speaker)
+        if reply is None:
+            reply = asyncio.ensure_future(self.ascene_response(
+                direction.get("prompt_for_character", "Continue the scene."),
+                slots[speaker], names[other], list(scene.lines),
+            ))
+
+        speculation = None
+        if pipelined and not direction.get("scene_complete", False):
+            speculation = self._speculate(director, scene, scene_instruction, keys, names, speaker,
+                                          direction.get("prompt_for_character", ""))
+
+        try:
+            response = await reply
+        except BaseException:
+            if speculation:
+                speculation.cancel()
+            raise
+
+        if response:
+            scene.add_line(names[speaker], response, character_id=speaker)
+            if speculation:
+                self._speculation = (self._scene_key(scene, scene_instruction, keys), speculation)
+        elif speculation:
+            speculation.cancel()
+        return direction
+
+    def _speculate(self, director: DirectorAgent, scene: SceneState, scene_instruction: str,
+                   keys: List[str], names: Dict[str, str], speaker: str, cue: str) -> Optional[asyncio.Task]:
+        """
+        Request the next step's director cue while `speaker` is still answering
+        `cue`. Only narration beats call the model, so other steps are not
+        speculated. The line being written is stood in for by its cue; see
+        _take_speculation for when the result is used.
+        """
+        exchange_count = scene.exchange_count + 1
+        if not director.needs_model(exchange_count):
+            return None
+        # Rotation is decided locally, so the next cue only lacks the line being generated
+        task = asyncio.ensure_future(director.adirect_scene(
+            scene_instruction, keys, f"{scene.transcript}[{names[speaker]} is answering: {cue}]\n",
+            last_speaker=speaker,
+            previous_narrations=list(scene.narrations),
+            exchange_count=exchange_count,
+            everyone_spoke=scene.distinct_speakers + (not scene.has_spoken(speaker)) >= len(keys),
+            names=names,
+        ))
+        task.add_done_callback(_consume_exception)
+        return task
+
+    async def _astream_direction(self, director: DirectorAgent, scene: SceneState, scene_instruction: str,
+                                 keys: List[str], names: Dict[str, str], slots: Dict[str, int],
+                                 on_narration: Optional[Callable[[str], None]]) -> Tuple[dict, Optional[asyncio.Task]]:
+        """Stream the director's cue, starting the character's reply as soon as the cue is complete"""
+        speaker, other = director.next_speaker(keys, scene.last_speaker)
+        lines = list(scene.lines)
+        started: List[Tuple[str, asyncio.Task]] = []
+
+        def start_reply(cue: str):
+            if not started:
+                task = asyncio.ensure_future(self.ascene_response(cue, slots[speaker], names[other], lines))
+                started.append((cue, task))
 
-    def group_chat(self, user_message: str) -> tuple[str, str]:
+        try:
+            direction = await director.adirect_scene_streaming(
+                scene_instruction, keys, scene.transcript,
+                last_speaker=scene.last_speaker,
+                previous_narrations=scene.narrations,
+                exchange_count=scene.exchange_count,
+                everyone_spoke=scene.distinct_speakers >= len(keys),
+                names=names,
+                on_cue=start_reply,
+                on_narration=on_narration,
+            )
+        except BaseException:
+            for _, task in started:
+                task.cancel()
+            raise
+
+        if not started:
+            return direction, None
+        cue, task = started[0]
+        # The character follows the streamed cue even if the full reply failed to parse
+        direction["prompt_for_character"] = cue
+        return direction, task
+
+    async def _afused_scene_step(self, director: DirectorAgent, scene: SceneState, scene_instruction: str,
+                                 keys: List[str], names: Dict[str, str], slots: Dict[str, int]) -> dict:
+        """One scene step with the narration and the character's line from a single call"""
+        speaker, other = director.next_speaker(keys, scene.last_speaker)
+        agent = self.get_agent(slots[speaker])
+        direction = await director.adirect_scene_fused(
+            scene_instruction, keys, agent.character_description, scene.transcript,
+            last_speaker=scene.last_speaker,
+            previous_narrations=scene.narrations,
+            exchange_count=scene.exchange_count,
+            everyone_spoke=scene.distinct_speakers >= len(keys),
+            names=names,
+        )
+
+        narration = direction.get("narration", "").strip()
+        if narration and len(narration) > 3:
+            scene.add_narration(narration)
+
+        line = direction.get("line")
+        cue = direction["prompt_for_character"]
+        if isinstance(line, str) and line.strip():
+            # Keep the character's own memory of the scene as in the two-call path
+            response = line.strip()
+            await agent.memory.aadd_turn(cue, response, summarize=False)
+        else:
+            # Locally directed turn (or no usable line): the character answers the cue itself
+            response = await agent.ascene_response(cue, names[other], list(scene.lines))
+
+        if response:
+            scene.add_line(names[speaker], response, character_id=speaker)
+        return direction
+
+    @staticmethod
+    def _scene_key(scene: SceneState, scene_instruction: str, keys: Sequence[str]) -> tuple:
+        return id(scene), scene.revision, scene_instruction, tuple(keys)
+
+    async def _take_speculation(self, key: tuple) -> Optional[dict]:
         """
-        Simulate a group chat: user sends a message, agent1 responds, then agent2 responds to both user and agent1.
-        Returns (agent1_reply, agent2_reply)
+        The speculative direction, else None (the director is asked again).
+        It is dropped when the scene was edited since it was requested, or when
+        it ends the scene: that call is left to a director that has read the
+        line. The written line itself is not checked against it.
         """
-        agent1, agent2 = self.agents[0], self.agents[1]
-        if not agent1 or not agent2:
-            return ("", "")
-        # Agent 1 responds to user
-        agent1_reply = agent1.chat(user_message)
-        # Agent 2 sees both user and agent1's reply
-        agent2_input = f"User: {user_message}\n{agent1.character_name}: {agent1_reply}"
-        agent2_reply = agent2.chat(agent2_input)
-        # Optionally, agent1 can see agent2's reply and respond again (for more turns)
-        return agent1_reply, agent2_reply
+        if self._speculation is None:
+            return None
+        spec_key, task = self._speculation
+        self._speculation = None
+        if spec_key != key:
+            task.cancel()
+            telemetry.count("director.speculation_discarded", reason="scene_changed")
+            return None
+        try:
+            direction = await task
+        except Exception as e:
+            log.warning("director.speculation_failed", error=str(e))
+            return None
+        if direction.get("scene_complete", False):
+            telemetry.count("director.speculation_discarded", reason="scene_complete")
+            return None
+        telemetry.count("director.speculation_used")
+        return direction
+
+    def _drop_speculation(self):
+        if self._speculation is not None:
+            _, task = self._speculation
+            self._speculation = None
+            task.get_loop().call_soon_threadsafe(task.cancel)
+
+    def group_chat(self, user_message: str, policy: str = None) -> Dict[int, str]:
+        """
+        Simulate a group chat: every agent replies to the user's message.
+        Replies that do not depend on each other run concurrently; see GROUP_CHAT_POLICIES.
+        Returns the reply of every created agent, by roster slot.
+        """
+        return async_bridge.run(self.agroup_chat(user_message, policy))
+
+    async def agroup_chat(self, user_message: str, policy: str = None) -> Dict[int, str]:
+        """Async variant of group_chat"""
+        slots = [idx for idx, agent in enumerate(self.agents) if agent]
+        agents = [self.agents[idx] for idx in slots]
+        depends_on = GROUP_CHAT_POLICIES[policy or config.GROUP_CHAT_POLICY]
+
+        tasks: List[asyncio.Task] = []
+
+        async def reply(i: int, agent: CharacterAgent) -> str:
+            deps = depends_on(i)
+            if not deps:
+                return await agent.achat(user_message)
+            # Agents that depend on others see the user's message and their replies
+            lines = [f"User: {user_message}"]
+            for j in deps:
+                lines.append(f"{agents[j].character_name}: {await tasks[j]}")
+            return await agent.achat("\n".join(lines))
+
+        # Dependencies always point to earlier slots, so their tasks exist before they are awaited
+        for i, agent in enumerate(agents):
+            tasks.append(asyncio.ensure_future(reply(i, agent)))
+        return dict(zip(slots, await asyncio.gather(*tasks)))
+
+
+class AgentService:
+    """
+    Process-wide registry of per-session agents.
+
+    Streamlit caches a single instance of this service for every browser
+    session, so agents are kept per session id. Sessions are evicted when
+    they have been idle for longer than the configured TTL, and the least
+    recently used sessions are dropped once capacity is exceeded.
+    """
+
+    def __init__(self, max_sessions: int = None, session_ttl: float = None):
+        self.max_sessions = max_sessions or config.AGENT_MAX_SESSIONS
+        self.session_ttl = session_ttl or config.AGENT_SESSION_TTL
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_session(self, session_id: str) -> AgentSession:
+        """Get (or create) the agents belonging to a browser session"""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = AgentSession(on_touch=lambda touched: self._touched(session_id, touched))
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = time.monotonic()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)[1].close()
+            return session
+
+    def drop_session(self, session_id: str):
+        """Forget all agents of a session"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session:
+            session.close()
+
+    def session_count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _touched(self, session_id: str, session: AgentSession):
+        # Keep the order by last access that _evict_idle relies on
+        with self._lock:
+            if self._sessions.get(session_id) is session:
+                self._sessions.move_to_end(session_id)
+
+    def _evict_idle(self):
+        # Sessions are ordered by last access, so stop at the first live one
+        cutoff = time.monotonic() - self.session_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            del self._sessions[session_id]
+            session.close()
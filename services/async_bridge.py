@@ -0,0 +1,36 @@
+"""
+Shared background event loop for running async service calls from Streamlit.
+
+Streamlit executes each page script on its own thread without an event loop.
+Pages submit coroutines here instead, so every in-flight LLM and image call
+of the process is multiplexed on one loop rather than holding a thread each.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide background loop, started on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-bridge", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro: Awaitable) -> Future:
+    """Schedule a coroutine on the background loop and return a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and wait for its result"""
+    return submit(coro).result(timeout)
@@ -0,0 +1,294 @@
+"""
+Record/replay layer ("cassettes") for every OpenAI, LangChain and Holara HTTP call.
+
+With CASSETTE_MODE=record, requests go to the real backends and every
+exchange is appended to CASSETTE_PATH (gzipped JSON lines). With
+CASSETTE_MODE=replay, responses are served from that file without any
+network access, after a simulated latency (CASSETTE_LATENCY).
+
+Requests are matched on method, path and normalized body: the host and
+secrets such as the Holara api_key are left out, so a cassette recorded
+against one endpoint replays against any other. Identical requests replay
+their recorded responses in order; the last one repeats once they run out.
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import importlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import config
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+SECRET_FIELDS = {"api_key"}
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class Cassette:
+    """Recorded HTTP exchanges, keyed by normalized request"""
+
+    def __init__(self, path: str, mode: str, latency: str = "0"):
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self._entries: Dict[str, Deque[dict]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(method: str, url: str, body, content_type: Optional[str]) -> str:
+        """Stable identity of a request, independent of host and secrets"""
+        parts = urlsplit(url)
+        if isinstance(body, str):
+            body = body.encode()
+        body = body or b""
+        content_type = (content_type or "").split(";")[0].strip()
+        if content_type == "application/json" and body:
+            try:
+                body = json.dumps(json.loads(body), sort_keys=True).encode()
+            except ValueError:
+                pass
+        elif content_type == "application/x-www-form-urlencoded":
+            fields = sorted((k, v) for k, v in parse_qsl(body.decode(), keep_blank_values=True)
+                            if k not in SECRET_FIELDS)
+            body = json.dumps(fields).encode()
+        digest = hashlib.sha256(f"{method.upper()} {parts.path}?{parts.query}\n".encode() + body)
+        return digest.hexdigest()[:24]
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """Next recorded response for a request key, or None if it was never recorded"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def record(self, key: str, method: str, url: str, status: int, headers, body: bytes, elapsed: float):
+        try:
+            text, encoding = body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode(), "base64"
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "path": urlsplit(url).path,
+            "status": status,
+            "headers": {name: headers[name] for name in _KEPT_HEADERS if name in headers},
+            "body": text,
+            "encoding": encoding,
+            "elapsed": round(elapsed, 4),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            # Every append adds a gzip member; readers see one concatenated stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def delay(self, entry: Optional[dict]) -> float:
+        """Simulated latency: the recorded duration, or a fixed number of seconds"""
+        if self.latency == "recorded":
+            return entry["elapsed"] if entry else 0.0
+        return float(self.latency or 0)
+
+    @staticmethod
+    def body(entry: Optional[dict]) -> bytes:
+        if entry is None:
+            return json.dumps({"error": {"message": "No cassette entry for this request"}}).encode()
+        if entry["encoding"] == "base64":
+            return base64.b64decode(entry["body"])
+        return entry["body"].encode("utf-8")
+
+    @staticmethod
+    def status(entry: Optional[dict]) -> int:
+        # A miss is a client error, so neither OpenAI nor the Holara client retries it
+        return entry["status"] if entry else 404
+
+    @staticmethod
+    def headers(entry: Optional[dict]) -> Dict[str, str]:
+        return entry["headers"] if entry else {"content-type": "application/json"}
+
+    def _load(self):
+        if not self.path.exists():
+            log.warning("cassette.not_found", path=str(self.path))  # Every request will miss
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+
+
+class CassetteTransport:
+    """
+    Wraps an httpx transport. Responses are built with the httpx package the
+    client itself uses, so this works for both httpx and the OpenAI SDK's client.
+    """
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def handle_request(self, request):
+        key = self._key(request)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key)
+            time.sleep(self.cassette.delay(entry))
+            return self._replayed(request, entry)
+        start = time.monotonic()
+        response = self.inner.handle_request(request)
+        return self._recorded(request, key, response, _Tee(response, self._recorder(request, key, response, start)))
+
+    async def handle_async_request(self, request):
+        key = self._key(request)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key)
+            await asyncio.sleep(self.cassette.delay(entry))
+            return self._replayed(request, entry)
+        start = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        return self._recorded(request, key, response, _AsyncTee(response, self._recorder(request, key, response, start)))
+
+    def close(self):
+        self.inner.close()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def _key(self, request) -> str:
+        return self.cassette.key(request.method, str(request.url), request.content,
+                                 request.headers.get("content-type"))
+
+    def _recorder(self, request, key: str, response, start: float) -> Callable[[bytes], None]:
+        def record(body: bytes):
+            self.cassette.record(key, request.method, str(request.url), response.status_code,
+                                 response.headers, body, time.monotonic() - start)
+        return record
+
+    def _recorded(self, request, key: str, response, stream):
+        # Chunks reach the caller as they arrive (SSE streams stay incremental);
+        # the exchange is written once the body has been read to the end
+        kept = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        return httpx.Response(response.status_code, headers=kept, stream=stream, request=request)
+
+    def _replayed(self, request, entry: Optional[dict]):
+        return self._response(request, self.cassette.status(entry), self.cassette.headers(entry),
+                              self.cassette.body(entry))
+
+    @staticmethod
+    def _response(request, status: int, headers, body: bytes):
+        # The body is already decoded, so only content-type style headers carry over
+        module = importlib.import_module(type(request).__module__.split(".")[0])
+        kept = {name: headers[name] for name in _KEPT_HEADERS if name in headers}
+        return module.Response(status, headers=kept, content=body, request=request)
+
+
+class _Tee(httpx.SyncByteStream):
+    """Passes a recorded response's decoded body through and records it when fully read"""
+
+    def __init__(self, response, record: Callable[[bytes], None]):
+        self.response = response
+        self.record = record
+
+    def __iter__(self) -> Iterator[bytes]:
+        parts = []
+        for chunk in self.response.iter_bytes():
+            parts.append(chunk)
+            yield chunk
+        self.record(b"".join(parts))  # A body abandoned halfway is not recorded
+
+    def close(self):
+        self.response.close()
+
+
+class _AsyncTee(httpx.AsyncByteStream):
+    """Async variant of _Tee; the gzip append runs in a worker thread, off the event loop"""
+
+    def __init__(self, response, record: Callable[[bytes], None]):
+        self.response = response
+        self.record = record
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        parts = []
+        async for chunk in self.response.aiter_bytes():
+            parts.append(chunk)
+            yield chunk
+        await asyncio.to_thread(self.record, b"".join(parts))
+
+    async def aclose(self):
+        await self.response.aclose()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests adapter that records or replays like CassetteTransport"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        key = self.cassette.key(request.method, request.url, request.body,
+                                request.headers.get("Content-Type"))
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key)
+            time.sleep(self.cassette.delay(entry))
+            return self._response(request, self.cassette.status(entry), self.cassette.headers(entry),
+                                  self.cassette.body(entry))
+        start = time.monotonic()
+        response = super().send(request, **kwargs)
+        self.cassette.record(key, request.method, request.url, response.status_code,
+                             response.headers, response.content, time.monotonic() - start)
+        return response
+
+    @staticmethod
+    def _response(request, status: int, headers, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+
+@lru_cache(maxsize=None)
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette, or None when CASSETTE_MODE is off"""
+    if config.CASSETTE_MODE not in ("record", "replay"):
+        return None
+    return Cassette(config.CASSETTE_PATH, config.CASSETTE_MODE, config.CASSETTE_LATENCY)
+
+
+def wrap_httpx_client(client):
+    """Route an httpx client (including its proxy mounts) through the active cassette"""
+    cassette = get_cassette()
+    if cassette is None:
+        return client
+    client._transport = CassetteTransport(client._transport, cassette)
+    client._mounts = {
+        pattern: CassetteTransport(transport, cassette) if transport is not None else None
+        for pattern, transport in client._mounts.items()
+    }
+    return client
@@ -0,0 +1,173 @@
+"""
+Bounded conversation memory for character agents.
+
+Keeps the most recent turns verbatim within a token budget and folds older
+turns into a rolling summary that is only refreshed every few turns. The
+refresh runs in the background on the services.async_bridge loop, so a reply
+never waits for it; the new summary is swapped in when it arrives.
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+import config
+from services import async_bridge, telemetry
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+Turn = Tuple[HumanMessage, AIMessage]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def _turn_tokens(turn: Turn) -> int:
+    return estimate_tokens(turn[0].content) + estimate_tokens(turn[1].content)
+
+
+class ConversationMemory:
+    """Sliding window of recent turns plus an incrementally updated summary"""
+
+    SUMMARY_SYSTEM_MESSAGE = (
+        "You maintain the running memory of a roleplay conversation. "
+        "Merge the new lines into the existing summary. Keep names, facts, promises, "
+        "emotional shifts and unresolved threads. Write in third person, at most 150 words. "
+        "Output only the updated summary."
+    )
+
+    def __init__(self, llm, ai_name: str = "Character", max_turns: int = None,
+                 token_budget: int = None, summary_every: int = None, max_pending: int = None):
+        self.llm = llm
+        self.ai_name = ai_name
+        self.max_turns = max_turns or config.HISTORY_MAX_TURNS
+        self.token_budget = token_budget or config.HISTORY_TOKEN_BUDGET
+        self.summary_every = summary_every or config.HISTORY_SUMMARY_EVERY
+        self.max_pending = max_pending or config.HISTORY_MAX_PENDING_TURNS
+
+        self.summary = ""
+        self.window: Deque[Turn] = deque()
+        self.pending: List[Turn] = []  # Evicted from the window, not yet summarized
+        self._window_tokens = 0
+        self._turns_since_summary = 0
+        self._folding: Optional[Future] = None  # Summary refresh in flight
+        self._generation = 0  # Bumped by clear(), so a late refresh is ignored
+        self._lock = threading.Lock()
+
+    def add_turn(self, human_content: str, ai_content: str, summarize: bool = True):
+        """
+        Record one exchange, slide the window and start a summary refresh if one
+        is due. With summarize=False no refresh starts; the turns wait for the
+        next turn that allows one (e.g. scene turns, whose prompt has the transcript).
+        """
+        with self._lock:
+            if self._record(human_content, ai_content) and summarize:
+                request = self._summary_request()
+                self._folding = async_bridge.submit(self._afold(request, list(self.pending), self._generation))
+
+    async def aadd_turn(self, human_content: str, ai_content: str, summarize: bool = True):
+        """Async variant of add_turn (the refresh is started, never awaited)"""
+        self.add_turn(human_content, ai_content, summarize)
+
+    def _record(self, human_content: str, ai_content: str) -> bool:
+        """Append the turn and slide the window; returns whether a summary refresh should start"""
+        turn = (HumanMessage(content=human_content), AIMessage(content=ai_content))
+        self.window.append(turn)
+        self._window_tokens += _turn_tokens(turn)
+
+        while len(self.window) > 1 and (
+            len(self.window) > self.max_turns or self._window_tokens > self.token_budget
+        ):
+            evicted = self.window.popleft()
+            self._window_tokens -= _turn_tokens(evicted)
+            self.pending.append(evicted)
+
+        if len(self.pending) > self.max_pending:
+            # Refreshes keep failing: forget the oldest turns rather than grow without bound
+            dropped = len(self.pending) - self.max_pending
+            del self.pending[:dropped]
+            telemetry.count("memory.dropped_turns")
+            log.warning("memory.dropped_turns", character=self.ai_name, turns=dropped)
+
+        self._turns_since_summary += 1
+        in_flight = self._folding is not None and not self._folding.done()
+        return bool(self.pending) and self._turns_since_summary >= self.summary_every and not in_flight
+
+    def messages(self) -> List[BaseMessage]:
+        """
+        Messages to send to the model: summary, the newest unsummarized turns
+        that fit in what the window leaves of the token budget, recent window
+        """
+        with self._lock:
+            messages = self._summary_messages()
+            room = self.token_budget - self._window_tokens
+            unsummarized = []
+            for turn in reversed(self.pending):
+                room -= _turn_tokens(turn)
+                if room < 0:
+                    break
+                unsummarized.append(turn)
+            for human, ai in reversed(unsummarized):
+                messages.extend((human, ai))
+            for human, ai in self.window:
+                messages.extend((human, ai))
+        return messages
+
+    def summary_messages(self) -> List[BaseMessage]:
+        """Only the rolling summary (empty until the first fold)"""
+        with self._lock:
+            return self._summary_messages()
+
+    def _summary_messages(self) -> List[BaseMessage]:
+        if not self.summary:
+            return []
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")]
+
+    def clear(self):
+        """Forget everything, including the summary"""
+        with self._lock:
+            self.summary = ""
+            self.window.clear()
+            self.pending = []
+            self._window_tokens = 0
+            self._turns_since_summary = 0
+            self._generation += 1
+
+    async def _afold(self, request: List[BaseMessage], folded: List[Turn], generation: int):
+        """Merge the snapshot of pending turns into the summary with a single model call"""
+        try:
+            response = await self.llm.ainvoke(request)
+        except Exception as e:
+            log.warning("memory.summary_failed", character=self.ai_name, error=str(e))
+            return
+        self._apply_summary(response.content, folded, generation)
+
+    def _summary_request(self) -> List[BaseMessage]:
+        lines = []
+        for human, ai in self.pending:
+            lines.append(f"Other: {human.content}")
+            lines.append(f"{self.ai_name}: {ai.content}")
+
+        # Retry after another full interval if the call fails; the turns stay pending meanwhile
+        self._turns_since_summary = 0
+        return [
+            SystemMessage(content=self.SUMMARY_SYSTEM_MESSAGE),
+            HumanMessage(content=(
+                f"Existing summary:\n{self.summary or '(none)'}\n\n"
+                "New lines:\n" + "\n".join(lines)
+            )),
+        ]
+
+    def _apply_summary(self, content: str, folded: List[Turn], generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return  # Cleared while the refresh was in flight
+            self.summary = content.strip()
+            # Turns evicted while the refresh was in flight stay pending for the next one
+            done = {id(turn) for turn in folded}
+            self.pending = [turn for turn in self.pending if id(turn) not in done]
@@ -1,11 +1,114 @@
 """
 Image generation service using Holara API
 """
+import asyncio
 import requests
 import json
 import base64
+import io
+import random
+import threading
+import time
+from functools import lru_cache
 from typing import Optional, Dict
+import httpx
+from requests.adapters import HTTPAdapter
+from PIL import Image
 import config
+from services import telemetry
+from services.cassette import CassetteAdapter, get_cassette, wrap_httpx_client
+from services.image_store import get_image_store
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated backend failures.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected for `reset_timeout` seconds; then a single trial call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted right now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give up a trial call without an outcome (e.g. it was cancelled), so another can be tried"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def settle(self, succeeded: Optional[bool]):
+        """Record how an allowed call ended; None means it was interrupted before it had an outcome"""
+        if succeeded is None:
+            self.release()
+        elif succeeded:
+            self.record_success()
+        else:
+            self.record_failure()
+
+
+@lru_cache(maxsize=None)
+def get_holara_async_client() -> httpx.AsyncClient:
+    """Pooled async Holara client (services.async_bridge loop only)"""
+    return wrap_httpx_client(httpx.AsyncClient(
+        timeout=httpx.Timeout(config.HOLARA_READ_TIMEOUT, connect=config.HOLARA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=config.HOLARA_POOL_SIZE,
+                            max_keepalive_connections=config.HOLARA_POOL_SIZE),
+    ))
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Exponential backoff with full jitter, honouring a numeric Retry-After header"""
+    if retry_after:
+        try:
+            return min(float(retry_after), config.HOLARA_BACKOFF_MAX)
+        except ValueError:
+            pass
+    cap = min(config.HOLARA_BACKOFF_MAX, config.HOLARA_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, cap)
+
 
 class ImageGenerationService:
     """Service for generating images with Holara API"""
@@ -13,6 +116,89 @@ class ImageGenerationService:
     def __init__(self):
         self.url = config.HOLARA_API_URL
         self.api_key = config.HOLARA_API_KEY
+        self.timeout = (config.HOLARA_CONNECT_TIMEOUT, config.HOLARA_READ_TIMEOUT)
+        self.max_retries = config.HOLARA_MAX_RETRIES
+        self.breaker = CircuitBreaker(config.HOLARA_BREAKER_THRESHOLD, config.HOLARA_BREAKER_RESET)
+
+        # Keep-alive connection pool shared by every session using this (cached) service
+        self.session = requests.Session()
+        cassette = get_cassette()
+        if cassette:
+            adapter = CassetteAdapter(cassette, pool_connections=1, pool_maxsize=config.HOLARA_POOL_SIZE)
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.HOLARA_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _post(self, data: Dict) -> Optional[requests.Response]:
+        """
+        POST to Holara with timeouts, bounded jittered retries on 429/5xx and
+        request errors, and the circuit breaker. Returns None on failure.
+        """
+        if not self.breaker.allow():
+            log.warning("holara.circuit_open")
+            return None
+
+        # Every way out of the loop settles the breaker, or a half-open trial would stay in flight forever
+        succeeded = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                try:
+                    response = self.session.post(self.url, data=data, timeout=self.timeout)
+                except requests.RequestException as e:
+                    log.warning("holara.request_failed", attempt=attempt + 1, error=str(e))
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        # 2xx, or a client error retrying will not fix; the backend is up either way
+                        succeeded = True
+                        return response
+                    log.warning("holara.retryable_status", attempt=attempt + 1, status=response.status_code)
+                    retry_after = response.headers.get("Retry-After")
+
+                if attempt < self.max_retries:
+                    time.sleep(_backoff_delay(attempt, retry_after))
+
+            succeeded = False
+            return None
+        except Exception:
+            succeeded = False
+            raise
+        finally:
+            self.breaker.settle(succeeded)
+        
+    async def _apost(self, data: Dict) -> Optional[httpx.Response]:
+        """Async variant of _post, sharing its retry policy and circuit breaker"""
+        if not self.breaker.allow():
+            log.warning("holara.circuit_open")
+            return None
+
+        client = get_holara_async_client()
+        succeeded = None  # Stays None on cancellation: the trial is released, not counted
+        try:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                try:
+                    response = await client.post(self.url, data=data)
+                except httpx.HTTPError as e:
+                    log.warning("holara.request_failed", attempt=attempt + 1, error=str(e))
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        succeeded = True
+                        return response
+                    log.warning("holara.retryable_status", attempt=attempt + 1, status=response.status_code)
+                    retry_after = response.headers.get("Retry-After")
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(_backoff_delay(attempt, retry_after))
+
+            succeeded = False
+            return None
+        except Exception:
+            succeeded = False
+            raise
+        finally:
+            self.breaker.settle(succeeded)
         
     def generate_image(self, prompt: str, negative_prompt: str = "") -> Optional[Dict]:
         """
@@ -23,10 +209,57 @@ class ImageGenerationService:
             negative_prompt: Things to avoid in the image
             
         Returns:
-            Dictionary with image_base64, execution_time, cost, and remaining_gems
+            Dictionary with image_key (see services.image_store), execution_time, cost,
+            and remaining_gems
             or None if generation fails
         """
-        data = {
+        try:
+            with self._track() as record:
+                response = self._post(self._payload(prompt, negative_prompt))
+                if response is None:
+                    record.update(error="unavailable")
+                    return None
+                return self._tracked(record, response, self._handle_response(response, prompt))
+            
+        except Exception as e:
+            log.error("holara.error", error=str(e))
+            return None
+
+    async def agenerate_image(self, prompt: str, negative_prompt: str = "") -> Optional[Dict]:
+        """Async variant of generate_image (run on the services.async_bridge loop)"""
+        try:
+            with self._track() as record:
+                response = await self._apost(self._payload(prompt, negative_prompt))
+                if response is None:
+                    record.update(error="unavailable")
+                    return None
+                # Decoding, disk writes and resizing stay off the event loop
+                result = await asyncio.to_thread(self._handle_response, response, prompt)
+                return self._tracked(record, response, result)
+            
+        except Exception as e:
+            log.error("holara.error", error=str(e))
+            return None
+
+    @staticmethod
+    def _track():
+        """Time a generation, retries included, as an 'image_call' telemetry event"""
+        return telemetry.track("image_call", call="holara.generate_image", provider="holara",
+                               model=config.HOLARA_MODEL)
+
+    @staticmethod
+    def _tracked(record: telemetry.CallRecord, response, result: Optional[Dict]) -> Optional[Dict]:
+        """Add Holara's own accounting of a generation to its telemetry event"""
+        record.update(status=response.status_code)
+        if result is None:
+            record.update(error=f"http_{response.status_code}")
+        else:
+            record.update(execution_time=result['execution_time'], generation_cost=result['cost'],
+                          hologems_remaining=result['remaining_gems'])
+        return result
+
+    def _payload(self, prompt: str, negative_prompt: str) -> Dict:
+        return {
             'api_key': self.api_key,
             'model': config.HOLARA_MODEL,
             'num_images': 1,
@@ -38,36 +271,48 @@ class ImageGenerationService:
             'cfg_scale': config.HOLARA_CFG_SCALE,
         }
 
-        try:
-            response = requests.post(self.url, data=data)
-            
-            if response.status_code != 200:
-                print(f'Error: {response.status_code} {response.content}')
-                return None
-                
-            response_data = json.loads(response.content)
-            
-            # Log basic information
-            print(f"\n{'='*50}")
-            print(f"Image Generation Status: {response_data['status']}")
-            print(f"Execution Time: {round(response_data['execution_time'], 2)}s")
-            print(f"Generation Cost: {response_data['generation_cost']}")
-            print(f"Hologems Remaining: {response_data['hologems_remaining']}")
-            print(f"Prompt: {prompt[:100]}...")
-            print(f"{'='*50}\n")
-            
-            image_base64 = response_data['images'][0]
-            
-            return {
-                'image_base64': image_base64,
-                'execution_time': response_data['execution_time'],
-                'cost': response_data['generation_cost'],
-                'remaining_gems': response_data['hologems_remaining']
-            }
+    def _handle_response(self, response, prompt: str) -> Optional[Dict]:
+        """Turn a Holara HTTP response into the result dictionary"""
+        if response.status_code != 200:
+            log.error("holara.bad_status", status=response.status_code, body=response.content[:1000])
+            return None
             
+        response_data = json.loads(response.content)
+        
+        log.info("holara.generation", status=response_data['status'],
+                 execution_time=response_data['execution_time'],
+                 generation_cost=response_data['generation_cost'],
+                 hologems_remaining=response_data['hologems_remaining'], prompt=prompt[:100])
+        
+        # Store the decoded image once, plus its display variants; callers only keep its key
+        image_key = get_image_store().put(base64.b64decode(response_data['images'][0]))
+        self._store_variants(image_key)
+        
+        return {
+            'image_key': image_key,
+            'execution_time': response_data['execution_time'],
+            'cost': response_data['generation_cost'],
+            'remaining_gems': response_data['hologems_remaining']
+        }
+    
+    def _store_variants(self, image_key: str):
+        """Render the configured display variants (compact, downscaled) of a stored image"""
+        store = get_image_store()
+        try:
+            with Image.open(io.BytesIO(store.get(image_key))) as original:
+                original.load()
+                for variant, width in config.IMAGE_VARIANTS.items():
+                    if store.has(image_key, variant):
+                        continue
+                    image = original.convert("RGB")
+                    if image.width > width:
+                        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    image.save(buffer, format=config.IMAGE_VARIANT_FORMAT, quality=config.IMAGE_VARIANT_QUALITY)
+                    store.put_variant(image_key, variant, buffer.getvalue())
         except Exception as e:
-            print(f"Error generating image: {str(e)}")
-            return None
+            # Pages fall back to the original image
+            log.warning("image.variants_failed", image_key=image_key, error=str(e))
     
     def generate_single_image(self, prompt: str, negative_prompt: str = "") -> Optional[Dict]:
         """
@@ -78,5 +323,10 @@ class ImageGenerationService:
         Returns:
             Dictionary with image data or None
         """
-        print("Generating single image...")
-        return self.generate_image(prompt, negative_prompt)
\ No newline at end of file
+        log.debug("holara.generate_single_image")
+        return self.generate_image(prompt, negative_prompt)
+
+    async def agenerate_single_image(self, prompt: str, negative_prompt: str = "") -> Optional[Dict]:
+        """Async variant of generate_single_image"""
+        log.debug("holara.generate_single_image")
+        return await self.agenerate_image(prompt, negative_prompt)
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Content-addressed on-disk store for generated images.
+
+Images are written once under the SHA-256 of their bytes; characters keep
+only the key. Since stored content never changes, decoded bytes can be
+cached in memory across every session of the process.
+"""
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import config
+
+ORIGINAL = "original"
+
+
+class ImageStore:
+    """Write-once image files keyed by the hash of their content"""
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or config.IMAGE_STORE_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str, variant: str = ORIGINAL) -> Path:
+        name = key if variant == ORIGINAL else f"{key}.{variant}"
+        return self.root / key[:2] / name
+
+    def put(self, data: bytes) -> str:
+        """Store image bytes and return their key (idempotent)"""
+        key = hashlib.sha256(data).hexdigest()
+        self._write(self.path(key), data)
+        return key
+
+    def put_variant(self, key: str, variant: str, data: bytes):
+        """Store a derived rendition (a downscaled display size) of the image under `key`"""
+        self._write(self.path(key, variant), data)
+
+    def has(self, key: str, variant: str = ORIGINAL) -> bool:
+        return self.path(key, variant).exists()
+
+    def get(self, key: str, variant: str = ORIGINAL) -> Optional[bytes]:
+        try:
+            return self.path(key, variant).read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, path: Path, data: bytes):
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            # The caller still gets the error (the key would point at nothing), but no temp file is left behind
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+@lru_cache(maxsize=None)
+def get_image_store() -> ImageStore:
+    """Process-wide image store"""
+    return ImageStore()
+
+
+@lru_cache(maxsize=config.IMAGE_CACHE_SIZE)
+def _load_image_cached(key: str, variant: str) -> bytes:
+    data = get_image_store().get(key, variant)
+    if data is None:
+        raise FileNotFoundError(key)
+    return data
+
+
+def load_image(key: str, variant: str = ORIGINAL) -> Optional[bytes]:
+    """
+    Image bytes for a key, from an in-memory LRU cache; None if missing.
+    Falls back to the original when the requested display variant was not produced.
+    """
+    if not key:
+        return None
+    names = (variant,) if variant == ORIGINAL else (variant, ORIGINAL)
+    for name in names:
+        try:
+            return _load_image_cached(key, name)
+        except FileNotFoundError:
+            continue
+    return None
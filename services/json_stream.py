@@ -0,0 +1,147 @@
+"""
+Incremental parser for a flat JSON object that arrives in chunks (e.g. a
+streamed model reply), so fields can be used before the reply completes.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class IncrementalJSONParser:
+    """
+    Feed text as it streams in; each top-level field is reported by feed() as
+    soon as its value is complete. Anything before the opening brace (such
+    as a ```json fence) is skipped, as is anything after the closing one.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.key: Optional[str] = None  # Key whose value is being read
+        self.done = False
+        self._state = "start"
+        self._chars: List[str] = []
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._depth = 0  # Nesting inside an object/array value
+        self._in_nested_string = False
+
+    @property
+    def partial(self) -> str:
+        """The string value read so far for `key` (empty unless a string is streaming)"""
+        return "".join(self._chars) if self._state == "string" else ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Consume a chunk and return the keys completed by it, in order.
+        Raises ValueError on input it cannot read (e.g. a bad \\u escape).
+        """
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            key = self._step(ch)
+            if key is not None:
+                completed.append(key)
+        return completed
+
+    def _step(self, ch: str) -> Optional[str]:
+        state = self._state
+        if state == "start":
+            if ch == "{":
+                self._state = "key"
+        elif state == "key":
+            # Waiting for the next key (or the end of the object)
+            if ch == '"':
+                self._chars = []
+                self._state = "key_string"
+            elif ch == "}":
+                self.done = True
+        elif state == "key_string":
+            if self._read_string_char(ch):
+                self.key = self._take_string()
+                self._state = "colon"
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value"
+        elif state == "value":
+            if ch == '"':
+                self._chars = []
+                self._state = "string"
+            elif ch in "{[":
+                self._chars = [ch]
+                self._depth = 1
+                self._state = "nested"
+            elif not ch.isspace():
+                self._chars = [ch]
+                self._state = "scalar"
+        elif state == "string":
+            if self._read_string_char(ch):
+                return self._complete(self._take_string())
+        elif state == "scalar":
+            if ch in ",}" or ch.isspace():
+                key = self._complete(self._loads("".join(self._chars)))
+                if ch == "}":
+                    self.done = True
+                return key
+            self._chars.append(ch)
+        elif state == "nested":
+            self._chars.append(ch)
+            if self._in_nested_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_nested_string = False
+            elif ch == '"':
+                self._in_nested_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._complete(self._loads("".join(self._chars)))
+        return None
+
+    def _read_string_char(self, ch: str) -> bool:
+        """Add one character of a string; True when it was the closing quote"""
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                self._chars.append(chr(int(self._unicode, 16)))
+                self._unicode = None
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                self._chars.append(_ESCAPES.get(ch, ch))
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            return True
+        else:
+            self._chars.append(ch)
+        return False
+
+    def _take_string(self) -> str:
+        value = "".join(self._chars)
+        self._chars = []
+        # Re-join surrogate pairs that were decoded one \u escape at a time
+        return value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+    def _complete(self, value: Any) -> str:
+        key = self.key
+        self.fields[key] = value
+        self.key = None
+        self._chars = []
+        self._state = "key"
+        return key
+
+    @staticmethod
+    def _loads(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw
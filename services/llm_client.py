@@ -0,0 +1,141 @@
+"""
+Process-wide OpenAI clients sharing one keep-alive connection pool
+"""
+from functools import lru_cache
+from typing import Dict, Optional
+from uuid import UUID
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+
+import config
+from services import telemetry
+from services.cassette import get_cassette, wrap_httpx_client
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    """Pooled HTTP client used by every OpenAI and LangChain call in the process"""
+    return wrap_httpx_client(openai.DefaultHttpxClient(
+        limits=_pool_limits(),
+        timeout=openai.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+    ))
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Pooled async HTTP client. Only use it from the services.async_bridge loop,
+    since its connections belong to the loop that opened them.
+    """
+    return wrap_httpx_client(openai.DefaultAsyncHttpxClient(
+        limits=_pool_limits(),
+        timeout=openai.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+    ))
+
+
+def _api_key() -> str:
+    # Replayed cassettes need no credentials, but the SDK refuses to start without a key
+    cassette = get_cassette()
+    if not config.OPENAI_API_KEY and cassette and cassette.replaying:
+        return "cassette-replay"
+    return config.OPENAI_API_KEY
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    """Shared OpenAI SDK client"""
+    return OpenAI(
+        api_key=_api_key(),
+        base_url=config.OPENAI_BASE_URL or None,
+        http_client=get_http_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_openai_client() -> AsyncOpenAI:
+    """Shared async OpenAI SDK client (services.async_bridge loop only)"""
+    return AsyncOpenAI(
+        api_key=_api_key(),
+        base_url=config.OPENAI_BASE_URL or None,
+        http_client=get_async_http_client(),
+    )
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Reports every ChatOpenAI call as an 'llm_call' telemetry event: wall time,
+    time to first token when streaming, and token usage. Calls are labelled
+    with their run name, or the name of the response schema they are bound to.
+    """
+
+    run_inline = True  # Time async calls on the loop itself, not in an executor
+
+    def __init__(self):
+        self._calls: Dict[UUID, telemetry.CallRecord] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, name: Optional[str] = None,
+                            invocation_params: Optional[Dict] = None, **kwargs):
+        if not telemetry.has_hooks():
+            return
+        params = invocation_params or {}
+        response_format = params.get("response_format") or {}
+        call = name or (response_format.get("json_schema") or {}).get("name") or "chat"
+        self._calls[run_id] = telemetry.CallRecord("llm_call", {
+            "call": call,
+            "provider": "openai",
+            "model": params.get("model_name") or params.get("model"),
+        })
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        record = self._calls.get(run_id)
+        if record is not None and token:
+            record.first_token()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        record = self._calls.pop(run_id, None)
+        if record is None:
+            return
+        generations = response.generations[0] if response.generations else []
+        usage = telemetry.cache_usage(getattr(generations[0], "message", None)) if generations else None
+        if usage:
+            record.update(**usage)
+        record.finish()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        record = self._calls.pop(run_id, None)
+        if record is not None:
+            record.update(error=type(error).__name__)
+            record.finish()
+
+
+_telemetry_handler = TelemetryCallbackHandler()
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model: Optional[str] = None, stream_usage: bool = False) -> ChatOpenAI:
+    """
+    Shared LangChain chat model. ChatOpenAI holds no conversation state, so
+    one instance per configuration serves every agent and session.
+    Async calls (ainvoke/astream) must run on the services.async_bridge loop.
+    """
+    return ChatOpenAI(
+        model=model or config.AGENT_MODEL,
+        api_key=_api_key(),
+        base_url=config.OPENAI_BASE_URL or None,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        stream_usage=stream_usage,
+        callbacks=[_telemetry_handler],
+    )
@@ -0,0 +1,133 @@
+"""
+Structured JSON logging for the services.
+
+Records are handed to a bounded queue and formatted and written by a
+background listener, so a call site only pays for a level check and an
+enqueue; nothing is formatted on the caller's thread. Debug records are
+additionally sampled (LOG_DEBUG_SAMPLE_RATE), and every field is truncated
+to LOG_MAX_FIELD_CHARS when it is finally written.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+
+import config
+from services import telemetry
+
+ROOT = "character_creator"
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields"""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            payload[key] = self._truncate(value)
+        if record.exc_text:
+            payload["exc"] = self._truncate(record.exc_text)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+    def _truncate(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, (dict, list, tuple)):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        elif not isinstance(value, str):
+            value = str(value)
+        if len(value) > self.max_chars:
+            return f"{value[:self.max_chars]}…(+{len(value) - self.max_chars} chars)"
+        return value
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Enqueues records unformatted and drops them (counted) when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is the listener's job; only a traceback has to be captured now
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            telemetry.count("log.dropped")
+
+
+@lru_cache(maxsize=None)
+def _configure() -> logging.Logger:
+    """Route the services' loggers through the queue to a JSON stream on stderr, once per process"""
+    root = logging.getLogger(ROOT)
+    root.setLevel(config.LOG_LEVEL.upper())
+    root.propagate = False
+
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter(config.LOG_MAX_FIELD_CHARS))
+    listener = QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Flush what is still queued
+
+    root.addHandler(_NonBlockingQueueHandler(records))
+    return root
+
+
+class StructuredLogger:
+    """
+    Logger taking a message plus keyword fields, e.g.
+    log.info("holara.generation", execution_time=3.2, cost=1)
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, message: str, **fields):
+        """Verbose record: only kept for LOG_DEBUG_SAMPLE_RATE of calls"""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        rate = config.LOG_DEBUG_SAMPLE_RATE
+        if rate < 1:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, exc_info: bool = False, **fields):
+        self._log(logging.ERROR, message, fields, exc_info)
+
+    def _log(self, level: int, message: str, fields: Dict[str, Any], exc_info: bool = False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, message, extra={"fields": fields}, exc_info=exc_info)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Structured logger for a service module (pass __name__)"""
+    root = _configure()
+    return StructuredLogger(root.getChild(name.rsplit(".", 1)[-1]))
@@ -0,0 +1,266 @@
+"""
+Metrics aggregated from telemetry events, for the debug panel and a Prometheus exporter.
+
+The registry listens to the 'llm_call' events of every OpenAI and LangChain
+call and the 'image_call' events of Holara generations (see services.telemetry)
+and keeps cumulative histograms of wall time, time to first token, token
+counts (and the cached share of prompt tokens) and Holara's execution time
+and cost, labelled by call and model.
+Telemetry counters (e.g. director repairs) are exported alongside.
+"""
+import bisect
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+from services import telemetry
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+PREFIX = "character_creator"
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+COST_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SHARE_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate from the buckets, interpolating linearly inside one (like
+        histogram_quantile), clamped to the smallest and largest values seen
+        """
+        if not self.count:
+            return 0.0
+        return min(max(self._interpolate(q), self.min), self.max)
+
+    def _interpolate(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # Beyond the last bound there is nothing to interpolate
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class MetricsRegistry:
+    """Histograms, counters and gauges keyed by name and labels; a telemetry hook feeds it"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: Sequence[float], description: str = "", **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+                self._descriptions.setdefault(name, description)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, description: str = "", **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._descriptions.setdefault(name, description)
+
+    def set_gauge(self, name: str, value: float, description: str = "", **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+            self._descriptions.setdefault(name, description)
+
+    def handle(self, event: str, fields: Dict):
+        """Telemetry hook"""
+        if event == "llm_call":
+            self._record_llm_call(fields)
+        elif event == "image_call":
+            self._record_image_call(fields)
+
+    def _record_llm_call(self, fields: Dict):
+        labels = {"call": fields.get("call", "unknown"), "model": fields.get("model") or "unknown"}
+        self.observe("llm_call_seconds", fields["wall_time"], SECONDS_BUCKETS,
+                     "Wall time of OpenAI / LangChain calls", **labels)
+        if "ttft" in fields:
+            self.observe("llm_time_to_first_token_seconds", fields["ttft"], SECONDS_BUCKETS,
+                         "Time to the first streamed token", **labels)
+        for kind in ("prompt", "completion", "cached"):
+            if f"{kind}_tokens" in fields:
+                self.observe(f"llm_{kind}_tokens", fields[f"{kind}_tokens"], TOKEN_BUCKETS,
+                             f"{kind.capitalize()} tokens per call", **labels)
+        if fields.get("prompt_tokens") and "cached_tokens" in fields:
+            self.observe("llm_cached_prompt_share", fields["cached_tokens"] / fields["prompt_tokens"], SHARE_BUCKETS,
+                         "Share of prompt tokens served from the provider cache", **labels)
+        if "error" in fields:
+            self.inc("llm_call_errors_total", description="Failed OpenAI / LangChain calls",
+                     error=fields["error"], **labels)
+
+    def _record_image_call(self, fields: Dict):
+        labels = {"model": fields.get("model") or "unknown"}
+        self.observe("holara_call_seconds", fields["wall_time"], SECONDS_BUCKETS,
+                     "Wall time of Holara generations, retries included", **labels)
+        if "execution_time" in fields:
+            self.observe("holara_execution_seconds", fields["execution_time"], SECONDS_BUCKETS,
+                         "Execution time reported by Holara", **labels)
+        if "generation_cost" in fields:
+            self.observe("holara_generation_cost", fields["generation_cost"], COST_BUCKETS,
+                         "Hologems charged per generation", **labels)
+        if "hologems_remaining" in fields:
+            self.set_gauge("holara_hologems_remaining", fields["hologems_remaining"],
+                           "Hologems left on the account after the last generation")
+        if "error" in fields:
+            self.inc("holara_call_errors_total", description="Failed Holara generations",
+                     error=fields["error"], **labels)
+
+    def summary(self) -> List[Dict]:
+        """One row per histogram (name, labels, count, mean, p50, p95), for display"""
+        with self._lock:
+            rows = [
+                {"metric": name, **dict(labels), "count": h.count, "mean": h.mean,
+                 "p50": h.quantile(0.5), "p95": h.quantile(0.95)}
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return rows
+
+    def values(self) -> Dict[str, float]:
+        """Counters (including telemetry counters) and gauges, by rendered name"""
+        with self._lock:
+            values = {_series(name, labels): value
+                      for (name, labels), value in sorted({**self._counters, **self._gauges}.items())}
+        for name, value in sorted(telemetry.counters().items()):
+            values[_series("events_total", _labels({"event": name}))] = value
+        return values
+
+    def render_prometheus(self) -> str:
+        """Everything in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            descriptions = dict(self._descriptions)
+
+        declared = set()
+
+        def declare(name: str, kind: str):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {PREFIX}_{name} {descriptions.get(name) or name}")
+                lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        for (name, labels), h in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{PREFIX}_{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}_{_series(name + '_sum', labels)} {h.sum:g}")
+            lines.append(f"{PREFIX}_{_series(name + '_count', labels)} {h.count}")
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{PREFIX}_{_series(name, labels)} {value:g}")
+        for (name, labels), value in gauges:
+            declare(name, "gauge")
+            lines.append(f"{PREFIX}_{_series(name, labels)} {value:g}")
+
+        events = telemetry.counters()
+        if events:
+            descriptions["events_total"] = "Telemetry counters (director repairs, fallbacks, ...)"
+            declare("events_total", "counter")
+            for name, value in sorted(events.items()):
+                lines.append(f"{PREFIX}_{_series('events_total', _labels({'event': name}))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _series(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@lru_cache(maxsize=None)
+def get_metrics() -> MetricsRegistry:
+    """The process-wide registry, subscribed to telemetry on first use"""
+    registry = MetricsRegistry()
+    telemetry.add_hook(registry.handle)
+    return registry
+
+
+class _ExporterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per scrape would drown the app's own output
+
+
+@lru_cache(maxsize=None)
+def start_exporter() -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics on METRICS_EXPORTER_HOST:METRICS_EXPORTER_PORT from a
+    daemon thread, once per process. Returns None when disabled (port 0) or
+    when the port is taken, e.g. by another app process on the same host.
+    """
+    get_metrics()
+    if not config.METRICS_EXPORTER_PORT:
+        return None
+    try:
+        server = ThreadingHTTPServer((config.METRICS_EXPORTER_HOST, config.METRICS_EXPORTER_PORT), _ExporterHandler)
+    except OSError as e:
+        log.warning("metrics.exporter_not_started", port=config.METRICS_EXPORTER_PORT, error=str(e))
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -1,12 +1,14 @@
 """
 Prompt generation service using OpenAI API (v1.x compatible)
 """
-from typing import Dict, Optional
-from openai import OpenAI
+from typing import Dict, Optional, Tuple
 import config
+from services import telemetry
+from services.llm_client import get_async_openai_client, get_openai_client
+from services.log import get_logger
+from services.response_cache import get_response_cache
 
-# Cliente OpenAI (API nova)
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+log = get_logger(__name__)
 
 
 class PromptGenerationService:
@@ -44,6 +46,10 @@ class PromptGenerationService:
     def __init__(self):
         # Modelo definido no config (ex: gpt-4o-mini)
         self.model = config.OPENAI_MODEL
+        # Cliente OpenAI compartilhado (pool de conexões do processo)
+        self.client = get_openai_client()
+        # Replies to repeated low-temperature requests, shared by every session (None = off)
+        self.cache = get_response_cache()
 
     def generate_initial_prompts(
         self,
@@ -53,42 +59,118 @@ class PromptGenerationService:
         """
         Generate initial image prompts and basic character info (Stage 1)
         """
-
-        messages = [
-            self.STAGE1_SYSTEM_MESSAGE,
-            {"role": "user", "content": appearance_string},
-        ]
+        request = self._stage1_request(appearance_string, creativity)
+        key, reply = self._cached("Stage 1", request)
+        if reply is not None:
+            return self._parse_stage1_response(reply)
         try:
-            print("[GPT-LOG] Sending Stage 1 prompt to OpenAI:")
-            print(f"Model: {self.model}")
-            print(f"Creativity (temperature): {creativity}")
-            print(f"Max tokens: {config.MAX_COMPLETION_TOKENS}")
-            print(f"Messages: {messages}")
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=config.MAX_COMPLETION_TOKENS,
-                temperature=creativity,
-            )
-            print("[GPT-LOG] OpenAI response received.")
-            print(f"Raw response: {response}")
-            reply = response.choices[0].message.content.strip()
-            print(f"[GPT-LOG] Parsed reply: {reply}")
+            self._log_request("Stage 1", request)
+            with self._track("prompt.stage1", request) as record:
+                response = self.client.chat.completions.create(**request)
+                record.update(**self._usage(response))
+            reply = self._log_response("Stage 1", response)
+        except Exception as e:
+            log.error("openai.error", stage="Stage 1", error=str(e))
+            return None
+        self._store(key, reply)
+        return self._parse_stage1_response(reply)
+
+    async def agenerate_initial_prompts(
+        self,
+        appearance_string: str,
+        creativity: float = 0.5
+    ) -> Optional[Dict]:
+        """
+        Async variant of generate_initial_prompts (run on the services.async_bridge loop)
+        """
+        request = self._stage1_request(appearance_string, creativity)
+        key, reply = await self._acached("Stage 1", request)
+        if reply is not None:
             return self._parse_stage1_response(reply)
+        try:
+            self._log_request("Stage 1", request)
+            with self._track("prompt.stage1", request) as record:
+                response = await get_async_openai_client().chat.completions.create(**request)
+                record.update(**self._usage(response))
+            reply = self._log_response("Stage 1", response)
         except Exception as e:
-            print(f"[GPT-LOG] OpenAI API error: {str(e)}")
+            log.error("openai.error", stage="Stage 1", error=str(e))
             return None
+        await self._astore(key, reply)
+        return self._parse_stage1_response(reply)
 
     def generate_full_backstory(
         self,
         appearance_string: str,
         personality_string: str,
         character_name: str,
+        creativity: Optional[float] = None,
     ) -> Optional[str]:
         """
         Generate detailed backstory (Stage 2)
         """
+        request = self._stage2_request(appearance_string, personality_string, character_name, creativity)
+        key, reply = self._cached("Stage 2", request)
+        if reply is not None:
+            return reply
+        try:
+            self._log_request("Stage 2", request)
+            with self._track("prompt.stage2", request) as record:
+                response = self.client.chat.completions.create(**request)
+                record.update(**self._usage(response))
+            reply = self._log_response("Stage 2", response)
+        except Exception as e:
+            log.error("openai.error", stage="Stage 2", error=str(e))
+            return None
+        self._store(key, reply)
+        return reply
+
+    async def agenerate_full_backstory(
+        self,
+        appearance_string: str,
+        personality_string: str,
+        character_name: str,
+        creativity: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Async variant of generate_full_backstory (run on the services.async_bridge loop)
+        """
+        request = self._stage2_request(appearance_string, personality_string, character_name, creativity)
+        key, reply = await self._acached("Stage 2", request)
+        if reply is not None:
+            return reply
+        try:
+            self._log_request("Stage 2", request)
+            with self._track("prompt.stage2", request) as record:
+                response = await get_async_openai_client().chat.completions.create(**request)
+                record.update(**self._usage(response))
+            reply = self._log_response("Stage 2", response)
+        except Exception as e:
+            log.error("openai.error", stage="Stage 2", error=str(e))
+            return None
+        await self._astore(key, reply)
+        return reply
+
+    def _stage1_request(self, appearance_string: str, creativity: float) -> Dict:
+        """Chat completion arguments for Stage 1"""
+        return {
+            "model": self.model,
+            "messages": [
+                self.STAGE1_SYSTEM_MESSAGE,
+                {"role": "user", "content": appearance_string},
+            ],
+            "max_tokens": config.MAX_COMPLETION_TOKENS,
+            "temperature": creativity,
+        }
 
+    def _stage2_request(
+        self,
+        appearance_string: str,
+        personality_string: str,
+        character_name: str,
+        creativity: Optional[float],
+    ) -> Dict:
+        """Chat completion arguments for Stage 2"""
         user_message = f"""
 Character Name: {character_name}
 
@@ -100,30 +182,68 @@ PERSONALITY & BACKGROUND:
 
 Create a detailed, engaging backstory for this character.
 """
+        request = {
+            "model": self.model,
+            "messages": [
+                self.STAGE2_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_message},
+            ],
+            "max_tokens": config.MAX_COMPLETION_TOKENS,
+        }
+        if creativity is not None:
+            request["temperature"] = creativity
+        return request
 
-        messages = [
-            self.STAGE2_SYSTEM_MESSAGE,
-            {"role": "user", "content": user_message},
-        ]
+    def _cached(self, stage: str, request: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """(cache key, cached reply) for a request; the key is None when it is not cacheable"""
+        key = self.cache.key(request) if self.cache else None
+        reply = self.cache.get(key) if key else None
+        if reply is not None:
+            log.debug("openai.cache_hit", stage=stage)
+        return key, reply
 
-        try:
-            print("[GPT-LOG] Sending Stage 2 prompt to OpenAI:")
-            print(f"Model: {self.model}")
-            print(f"Max tokens: {getattr(config, 'MAX_COMPLETION_TOKENS', getattr(config, 'MAX_TOKENS', None))}")
-            print(f"Messages: {messages}")
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=getattr(config, 'MAX_COMPLETION_TOKENS', getattr(config, 'MAX_TOKENS', None)),
-            )
-            print("[GPT-LOG] OpenAI response received (Stage 2).")
-            print(f"Raw response: {response}")
-            reply = response.choices[0].message.content.strip()
-            print(f"[GPT-LOG] Parsed reply: {reply}")
-            return reply
-        except Exception as e:
-            print(f"[GPT-LOG] OpenAI API error (stage 2): {e}")
-            return None
+    async def _acached(self, stage: str, request: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """Async variant of _cached (disk reads stay off the event loop)"""
+        key = self.cache.key(request) if self.cache else None
+        reply = await self.cache.aget(key) if key else None
+        if reply is not None:
+            log.debug("openai.cache_hit", stage=stage)
+        return key, reply
+
+    def _store(self, key: Optional[str], reply: str):
+        if key and reply:
+            self.cache.put(key, reply)
+
+    async def _astore(self, key: Optional[str], reply: str):
+        if key and reply:
+            await self.cache.aput(key, reply)
+
+    def _track(self, call: str, request: Dict):
+        """Time a chat completion call as an 'llm_call' telemetry event"""
+        return telemetry.track("llm_call", call=call, provider="openai", model=request["model"])
+
+    @staticmethod
+    def _usage(response) -> Dict:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return {}
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": usage.prompt_tokens or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "completion_tokens": usage.completion_tokens or 0,
+        }
+
+    def _log_request(self, stage: str, request: Dict):
+        log.debug("openai.request", stage=stage, model=request["model"],
+                  temperature=request.get("temperature"), max_tokens=request["max_tokens"],
+                  messages=request["messages"])
+
+    def _log_response(self, stage: str, response) -> str:
+        """Log the (sampled, truncated) raw response and return the reply text"""
+        reply = response.choices[0].message.content.strip()
+        log.debug("openai.response", stage=stage, reply=reply, raw=response)
+        return reply
 
     def _parse_stage1_response(self, response: str) -> Dict:
         """Parse Stage 1 response into structured data"""
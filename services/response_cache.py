@@ -0,0 +1,171 @@
+"""
+Process-wide cache of model replies for repeated, low-temperature prompt requests.
+
+Requests are keyed on model, max tokens, the whitespace-normalized messages
+and the temperature rounded to PROMPT_CACHE_TEMPERATURE_STEP, so the same
+appearance or personality fields asked for again (demo presets, repeated
+"Generate" clicks) are answered without calling the API. Only requests at or
+below PROMPT_CACHE_MAX_TEMPERATURE are cached: above it, a new reply is the
+point of asking again.
+
+Entries live in a bounded LRU with a TTL. With PROMPT_CACHE_DIR set they are
+also written there as small JSON files and survive restarts; expired files
+are removed when they are next read. A failing disk only costs the cache:
+errors are logged and the entry stays in memory.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import config
+from services import telemetry
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+_SPACES = re.compile(r"[ \t\f\v]+")
+DEFAULT_TEMPERATURE = 1.0  # What the API uses when a request sets none
+
+
+def normalize(text: str) -> str:
+    """Unicode-normalized text with runs of spaces collapsed and blank lines dropped"""
+    lines = (_SPACES.sub(" ", line).strip() for line in unicodedata.normalize("NFC", text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ResponseCache:
+    """Bounded LRU of reply texts with a TTL, optionally persisted to a directory"""
+
+    def __init__(self, max_entries: int, ttl: float, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (stored at, reply)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: Dict) -> Optional[str]:
+        """Cache key of a chat completion request, or None if its temperature is too high to cache"""
+        temperature = request.get("temperature")
+        temperature = DEFAULT_TEMPERATURE if temperature is None else temperature
+        if temperature > config.PROMPT_CACHE_MAX_TEMPERATURE:
+            return None
+        step = config.PROMPT_CACHE_TEMPERATURE_STEP
+        identity = [
+            request["model"],
+            request.get("max_tokens"),
+            round(round(temperature / step) * step, 6) if step else temperature,
+            [[message["role"], normalize(message["content"])] for message in request["messages"]],
+        ]
+        return hashlib.sha256(json.dumps(identity, ensure_ascii=False).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached reply for a key (counted as a hit or a miss)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        telemetry.count("prompt_cache.misses" if entry is None else "prompt_cache.hits")
+        return entry[1] if entry else None
+
+    def put(self, key: str, reply: str):
+        entry = (time.time(), reply)
+        self._remember(key, entry)
+        self._write(key, entry)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async variant of get: with a cache directory, the lookup runs in a worker thread"""
+        if self.directory is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, reply: str):
+        """Async variant of put: with a cache directory, the write runs in a worker thread"""
+        if self.directory is None:
+            self.put(key, reply)
+        else:
+            await asyncio.to_thread(self.put, key, reply)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = len(self._entries)
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def _remember(self, key: str, entry: Tuple[float, str]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if now - data["stored_at"] > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return data["stored_at"], data["reply"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("prompt_cache.read_failed", path=str(path), error=str(e))
+            return None
+
+    def _write(self, key: str, entry: Tuple[float, str]):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": entry[0], "reply": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("prompt_cache.write_failed", path=str(path), error=str(e))
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide prompt reply cache, or None when PROMPT_CACHE_SIZE is 0"""
+    if config.PROMPT_CACHE_SIZE <= 0:
+        return None
+    return ResponseCache(config.PROMPT_CACHE_SIZE, config.PROMPT_CACHE_TTL, config.PROMPT_CACHE_DIR or None)
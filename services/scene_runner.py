@@ -0,0 +1,181 @@
+"""
+Background worker that plays a directed scene independently of Streamlit reruns.
+
+The worker owns the scene: it runs steps back to back and publishes every
+change to a bounded queue that the page drains. Edits coming from the page
+(interjections, adjustments, redo) are queued as commands and applied
+between steps, so the scene never changes while a step is in flight.
+"""
+import queue
+import threading
+from collections import deque
+from typing import Callable, List, Sequence, Tuple
+
+import config
+from models.scene import CastMember, SceneState
+from services.log import get_logger
+
+log = get_logger(__name__)
+
+# Kinds of updates published to the page
+EVENT = "event"          # payload: a new scene event
+TRUNCATE = "truncate"    # payload: number of events kept
+STATUS = "status"        # payload: "complete" or "error"
+
+CONCLUSION = "🎬 *The scene reaches its natural conclusion.*"
+
+
+class SceneRunner:
+    """Plays one scene on a worker thread; pause, resume and step map to worker control"""
+
+    def __init__(self, session, scene: SceneState, scene_instruction: str,
+                 cast: Sequence[CastMember], pipelined: bool = False, fused: bool = False,
+                 max_pending: int = None):
+        self.session = session  # AgentSession that owns the agents
+        self.scene = scene
+        self.scene_instruction = scene_instruction
+        self.cast = list(cast)
+        self.pipelined = pipelined
+        self.fused = fused
+        self.updates: "queue.Queue[Tuple[str, object]]" = queue.Queue(maxsize=max_pending or config.SCENE_QUEUE_SIZE)
+        self.busy = False  # A step is in flight
+        self.draft = ""  # Narration of the step in flight, while it streams
+        self._cond = threading.Condition()
+        self._commands: "deque[Callable[[], None]]" = deque()
+        self._playing = False
+        self._steps = 0  # Single steps requested while paused
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="scene-runner", daemon=True)
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    def start(self, playing: bool = True) -> "SceneRunner":
+        self._playing = playing
+        self._thread.start()
+        return self
+
+    def play(self):
+        with self._cond:
+            self._playing = True
+            self._cond.notify()
+
+    def pause(self):
+        """Stop after the step in flight, if any"""
+        with self._cond:
+            self._playing = False
+            self._steps = 0
+
+    def step(self):
+        """Advance one step while paused"""
+        with self._cond:
+            self._steps += 1
+            self._cond.notify()
+
+    def stop(self):
+        """End the worker; a step in flight is finished but not published"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def interject(self, text: str):
+        """User interjection: becomes part of the premise and the transcript, then play on"""
+        self._command(lambda: self._direct(f"New direction: {text}", text))
+        self.play()
+
+    def adjust(self, text: str):
+        """Adjustment made while paused, then play on"""
+        self._command(lambda: self._direct(f"Adjustment: {text}", f"[Adjustment] {text}"))
+        self.play()
+
+    def redo_last(self):
+        """Drop the last step (its narration, if any, and character line) and play on"""
+        self._command(self._redo)
+        self.play()
+
+    def poll(self) -> List[Tuple[str, object]]:
+        """Updates published since the last poll, without blocking"""
+        items = []
+        while True:
+            try:
+                items.append(self.updates.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _command(self, command: Callable[[], None]):
+        with self._cond:
+            self._commands.append(command)
+            self._cond.notify()
+
+    def _direct(self, instruction: str, event: str):
+        self.scene_instruction = f"{self.scene_instruction}\n\n{instruction}"
+        before = len(self.scene)
+        self.scene.add_direction(event)
+        self._publish_since(before)
+
+    def _redo(self):
+        if self.scene.undo_step():
+            self._publish(TRUNCATE, len(self.scene))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._stopped or self._commands or self._playing or self._steps):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                commands = list(self._commands)
+                self._commands.clear()
+            for command in commands:
+                command()
+
+            with self._cond:
+                if not (self._playing or self._steps) or self._stopped:
+                    continue
+                self._steps = max(self._steps - 1, 0)
+            self._advance()
+
+    def _advance(self):
+        before = len(self.scene)
+        self.busy = True
+        try:
+            direction = self.session.scene_step(
+                self.scene, self.scene_instruction, self.cast, self.pipelined, self.fused,
+                on_narration=self._set_draft
+            )
+        except Exception as e:
+            log.error("scene.step_failed", exc_info=True, error=str(e))
+            self._halt("error")
+            return
+        finally:
+            self.busy = False
+            self.draft = ""
+
+        complete = direction.get("scene_complete", False)
+        if complete:
+            self.scene.add_narration(CONCLUSION)
+        self._publish_since(before)
+        if complete:
+            self._halt("complete")
+
+    def _set_draft(self, narration: str):
+        self.draft = narration
+
+    def _halt(self, status: str):
+        self.pause()
+        self._publish(STATUS, status)
+
+    def _publish_since(self, start: int):
+        for event in self.scene.events[start:]:
+            self._publish(EVENT, event)
+
+    def _publish(self, kind: str, payload):
+        # Blocks while the page is not draining (e.g. the tab was closed), so an
+        # unattended scene stops spending tokens once the queue is full
+        while not self._stopped:
+            try:
+                self.updates.put((kind, payload), timeout=1)
+                return
+            except queue.Full:
+                continue
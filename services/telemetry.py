@@ -0,0 +1,121 @@
+"""
+Instrumentation hooks for model calls.
+
+Services report events here; anything interested (debug panels, exporters,
+benchmarks) registers a hook. With no hooks registered, reporting is free.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+Hook = Callable[[str, Dict[str, Any]], None]
+
+_hooks: List[Hook] = []
+_counters: Dict[str, int] = {}
+_counters_lock = threading.Lock()
+
+
+def add_hook(hook: Hook):
+    """Register a callable receiving (event_name, fields) for every event"""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def has_hooks() -> bool:
+    """Whether anyone is listening; lets callers skip computing expensive fields"""
+    return bool(_hooks)
+
+
+def emit(event: str, **fields):
+    """Send an event to every registered hook; hook errors never reach callers"""
+    for hook in list(_hooks):
+        try:
+            hook(event, fields)
+        except Exception as e:
+            if event != "log.dropped":  # Logging it would overflow the full log queue again
+                from services.log import get_logger  # services.log imports this module
+                get_logger(__name__).warning("telemetry.hook_failed", event=event, error=str(e))
+
+
+def count(name: str, **fields):
+    """Increment a process-wide counter; also emitted as an event of the same name"""
+    with _counters_lock:
+        _counters[name] = _counters.get(name, 0) + 1
+    if _hooks:
+        emit(name, **fields)
+
+
+def counters() -> Dict[str, int]:
+    """Snapshot of every counter incremented so far"""
+    with _counters_lock:
+        return dict(_counters)
+
+
+class CallRecord:
+    """
+    Wall time, time to first token and result fields of one backend call,
+    emitted as a single event when the call finishes
+    """
+
+    def __init__(self, event: str, fields: Dict[str, Any]):
+        self.event = event
+        self.fields = fields
+        self.start = time.perf_counter()
+        self.ttft: Optional[float] = None
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+
+    def update(self, **fields):
+        self.fields.update(fields)
+
+    def finish(self):
+        if not _hooks:
+            return
+        fields = dict(self.fields, wall_time=time.perf_counter() - self.start)
+        if self.ttft is not None:
+            fields["ttft"] = self.ttft
+        emit(self.event, **fields)
+
+
+@contextmanager
+def track(event: str, **fields) -> Iterator[CallRecord]:
+    """Time the enclosed backend call; an exception is recorded as the event's `error` and re-raised"""
+    record = CallRecord(event, fields)
+    try:
+        yield record
+    except Exception as e:
+        record.update(error=type(e).__name__)
+        raise
+    finally:
+        record.finish()
+
+
+def cache_usage(response) -> Optional[Dict[str, int]]:
+    """Extract prompt, cached and completion token counts from a LangChain message"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "cached_tokens": details.get("cache_read", 0) or 0,
+            "completion_tokens": usage.get("output_tokens", 0),
+        }
+
+    # Older langchain-openai versions only expose the raw OpenAI usage block
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return {
+            "prompt_tokens": token_usage.get("prompt_tokens", 0),
+            "cached_tokens": details.get("cached_tokens", 0) or 0,
+            "completion_tokens": token_usage.get("completion_tokens", 0),
+        }
+    return None
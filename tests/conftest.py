@@ -0,0 +1,16 @@
+"""
+Shared fixtures: services run offline against benchmarks.fake_backend,
+with images and caches in a temporary directory.
+"""
+import pytest
+
+from benchmarks.fake_backend import FakeBackend
+from benchmarks.run import configure
+
+
+@pytest.fixture(scope="session")
+def backend(tmp_path_factory):
+    backend = FakeBackend(latency=0.0, image_latency=0.0, image_size=(64, 96)).start()
+    configure(backend, str(tmp_path_factory.mktemp("images")))
+    yield backend
+    backend.stop()
@@ -0,0 +1,108 @@
+"""
+Per-session agent registry: isolation, eviction and stopping scene workers
+"""
+import time
+
+from models.scene import SceneState
+from services.agent_service import AgentService
+
+CAST = [(0, "Aoi"), (1, "Ren")]
+
+
+def test_touch_keeps_a_session_from_idling_out():
+    service = AgentService(session_ttl=0.2)
+    watched = service.for_session("watched")
+    service.for_session("idle")
+    time.sleep(0.15)
+    watched.touch()  # e.g. the scene feed fragment polling
+    time.sleep(0.1)
+
+    service.for_session("new")
+
+    assert service.for_session("watched") is watched
+    assert service.session_count() == 2  # "idle" was evicted
+
+
+def test_touch_refreshes_lru_order():
+    service = AgentService(max_sessions=2)
+    first = service.for_session("first")
+    service.for_session("second")
+    first.touch()
+
+    service.for_session("third")
+
+    assert service.for_session("first") is first
+    assert service.session_count() == 2
+
+
+def test_stop_scene_ends_the_worker_thread(backend):
+    session = AgentService().for_session("s")
+    session.create_agent("A sly fox girl.", "Aoi", 0)
+    session.create_agent("A tired detective.", "Ren", 1)
+    runner = session.start_scene(SceneState(), "A rainy night.", CAST, playing=False)
+
+    session.stop_scene()
+    runner._thread.join(timeout=2)
+
+    assert not runner._thread.is_alive()
+    assert session.get_scene_runner() is None
+
+
+def test_sessions_never_share_agents_or_memory(backend):
+    service = AgentService()
+    alice, bob = service.for_session("alice"), service.for_session("bob")
+    for session in (alice, bob):
+        session.create_agent("A sly fox girl.", "Aoi", 0)
+        session.create_director()
+
+    alice.chat_with_character("My name is Alice.", 0)
+
+    assert alice is not bob
+    assert alice.get_agent(0) is not bob.get_agent(0)
+    assert alice.get_agent(0).memory is not bob.get_agent(0).memory
+    assert alice.director is not bob.director
+    assert len(alice.get_agent(0).get_conversation_history()) == 2
+    assert bob.get_agent(0).get_conversation_history() == []
+    assert service.for_session("alice") is alice
+
+
+def start_runner(session):
+    session.create_agent("A sly fox girl.", "Aoi", 0)
+    session.create_agent("A tired detective.", "Ren", 1)
+    return session.start_scene(SceneState(), "A rainy night.", CAST, playing=False)
+
+
+def test_idle_eviction_stops_the_scene_runner(backend):
+    service = AgentService(session_ttl=0.1)
+    runner = start_runner(service.for_session("idle"))
+    time.sleep(0.15)
+
+    fresh = service.for_session("idle")
+    runner._thread.join(timeout=2)
+
+    assert not runner._thread.is_alive()
+    assert fresh.get_scene_runner() is None
+    assert fresh.get_agent(0) is None  # A new, empty session
+
+
+def test_lru_eviction_stops_the_scene_runner(backend):
+    service = AgentService(max_sessions=2)
+    runner = start_runner(service.for_session("oldest"))
+    service.for_session("newer")
+
+    service.for_session("newest")
+    runner._thread.join(timeout=2)
+
+    assert not runner._thread.is_alive()
+    assert service.session_count() == 2
+
+
+def test_drop_session_stops_the_scene_runner(backend):
+    service = AgentService()
+    runner = start_runner(service.for_session("gone"))
+
+    service.drop_session("gone")
+    runner._thread.join(timeout=2)
+
+    assert not runner._thread.is_alive()
+    assert service.session_count() == 0
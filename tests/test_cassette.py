@@ -0,0 +1,66 @@
+"""
+Cassette recording: streamed bodies pass through as they arrive and replay intact
+"""
+import asyncio
+import threading
+
+import httpx
+
+from services.cassette import Cassette, CassetteTransport
+
+CHAT = {"model": "gpt-5-mini", "stream": True, "messages": [{"role": "user", "content": "Hello"}]}
+
+
+def test_recording_streams_before_the_body_is_complete(backend, tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    client = httpx.Client(transport=CassetteTransport(httpx.HTTPTransport(), Cassette(str(path), "record")))
+
+    with client.stream("POST", f"{backend.openai_base_url}/chat/completions", json=CHAT) as response:
+        chunks = response.iter_bytes()
+        first = next(chunks)
+        assert first.startswith(b"data: ")
+        assert not path.exists()  # Nothing is recorded until the stream ends
+        body = first + b"".join(chunks)
+    assert body.endswith(b"data: [DONE]\n\n")
+
+    replay = httpx.Client(transport=CassetteTransport(httpx.HTTPTransport(), Cassette(str(path), "replay")))
+    response = replay.post("http://elsewhere/v1/chat/completions", json=CHAT)
+    assert response.status_code == 200
+    assert response.content == body
+
+
+def test_async_recording_round_trip(backend, tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+
+    async def post(mode: str, base_url: str) -> bytes:
+        transport = CassetteTransport(httpx.AsyncHTTPTransport(), Cassette(path, mode))
+        client = httpx.AsyncClient(transport=transport)
+        try:
+            response = await client.post(f"{base_url}/chat/completions", json=CHAT)
+            return response.content
+        finally:
+            await client.aclose()
+
+    recorded = asyncio.run(post("record", backend.openai_base_url))
+    assert recorded.endswith(b"data: [DONE]\n\n")
+    assert asyncio.run(post("replay", "http://elsewhere/v1")) == recorded
+
+
+def test_async_recording_writes_off_the_event_loop(backend, tmp_path, monkeypatch):
+    cassette = Cassette(str(tmp_path / "session.jsonl.gz"), "record")
+    writers = []
+    record = cassette.record
+    monkeypatch.setattr(cassette, "record", lambda *args: (writers.append(threading.get_ident()), record(*args)))
+
+    async def post():
+        client = httpx.AsyncClient(transport=CassetteTransport(httpx.AsyncHTTPTransport(), cassette))
+        try:
+            await client.post(f"{backend.openai_base_url}/chat/completions", json=CHAT)
+        finally:
+            await client.aclose()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(post())
+
+    assert len(writers) == 1
+    assert writers[0] != loop_thread
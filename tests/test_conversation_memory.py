@@ -0,0 +1,81 @@
+"""
+ConversationMemory window, budget and background summary refresh
+"""
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, SystemMessage
+
+from services.conversation_memory import ConversationMemory, estimate_tokens
+
+
+class SummaryModel:
+    """Stands in for the summary chat model: slow, or failing"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("summary backend down")
+        return AIMessage(content=f"summary #{self.calls}")
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_summary_refresh_does_not_block_the_turn():
+    model = SummaryModel(delay=0.5)
+    memory = ConversationMemory(model, max_turns=2, token_budget=10_000, summary_every=3)
+
+    start = time.monotonic()
+    for i in range(3):
+        memory.add_turn(f"question {i}", f"answer {i}")
+    assert time.monotonic() - start < 0.2
+    assert memory.summary == ""
+
+    wait_until(lambda: memory.summary == "summary #1")
+    assert memory.pending == []
+    assert isinstance(memory.messages()[0], SystemMessage)
+
+
+def test_pending_turns_count_against_the_budget():
+    memory = ConversationMemory(SummaryModel(fail=True), max_turns=2, token_budget=40,
+                                summary_every=100)
+    for i in range(6):
+        memory.add_turn(f"question number {i}", f"a fairly long answer number {i}")
+
+    sent = sum(estimate_tokens(message.content) for message in memory.messages())
+    assert len(memory.pending) == 4
+    assert sent <= 40
+    assert memory.messages()[-1].content == "a fairly long answer number 5"
+
+
+def test_failed_refreshes_cap_pending_turns():
+    model = SummaryModel(fail=True)
+    memory = ConversationMemory(model, max_turns=1, token_budget=10_000, summary_every=2, max_pending=3)
+    for i in range(12):
+        memory.add_turn(f"question {i}", f"answer {i}")
+        wait_until(lambda: memory._folding is None or memory._folding.done())
+
+    assert model.calls > 1
+    assert len(memory.pending) == 3
+    assert memory.pending[-1][1].content == "answer 10"
+
+
+def test_clear_discards_a_refresh_in_flight():
+    memory = ConversationMemory(SummaryModel(delay=0.2), max_turns=1, token_budget=10_000, summary_every=1)
+    memory.add_turn("question", "answer")
+    memory.add_turn("question", "answer")
+    memory.clear()
+
+    memory._folding.result(timeout=5)
+    assert memory.summary == ""
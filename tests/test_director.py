@@ -0,0 +1,118 @@
+"""
+Director replies: strict-schema validation, the one-shot repair and its fallback
+"""
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import config
+from services import telemetry
+from services.agent_service import DirectorAgent, parse_direction
+
+CAST = ["Aoi", "Ren"]
+PREMISE = "A rainy night in an arcade."
+VALID = json.dumps({"prompt_for_character": "Tell Ren the truth.", "next_character": "Aoi",
+                    "narration": "Rain drums on the roof.", "scene_complete": False})
+
+
+class FailingModel:
+    """Stands in for a repair call that errors out"""
+
+    def invoke(self, messages):
+        raise RuntimeError("backend down")
+
+    async def ainvoke(self, messages):
+        raise RuntimeError("backend down")
+
+
+@pytest.fixture
+def director(backend):
+    return DirectorAgent()
+
+
+def counter_deltas(action):
+    names = ("director.parse_failures", "director.repairs", "director.fallbacks")
+    before = {name: telemetry.counters().get(name, 0) for name in names}
+    result = action()
+    return result, {name: telemetry.counters().get(name, 0) - before[name] for name in names}
+
+
+def direct(director, mode: str):
+    # exchange_count=0 is a narration beat, so the model is always called
+    if mode == "async":
+        return asyncio.run(director.adirect_scene(PREMISE, CAST, exchange_count=0))
+    return director.direct_scene(PREMISE, CAST, exchange_count=0)
+
+
+@pytest.mark.parametrize("content, problem", [
+    ("no braces here", "no JSON object found"),
+    ('{"prompt_for_character": "x", "narration": }', "invalid JSON"),
+    ('{"narration": "x"}', 'missing "prompt_for_character"'),
+    ('{"prompt_for_character": "x", "narration": 3}', '"narration" must be a string'),
+    ('{"prompt_for_character": "x", "narration": "", "scene_complete": "no"}', '"scene_complete" must be a boolean'),
+])
+def test_parse_direction_reports_the_problem(content, problem):
+    result, found = parse_direction(content, "scene_direction")
+    assert result is None
+    assert found.startswith(problem)
+
+
+def test_parse_direction_accepts_a_fenced_reply():
+    result, problem = parse_direction(f"```json\n{VALID}\n```", "scene_direction")
+    assert problem == ""
+    assert result == json.loads(VALID)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_valid_reply_needs_no_repair(director, mode):
+    director.direction_llm = FakeListChatModel(responses=[VALID])
+
+    direction, deltas = counter_deltas(lambda: direct(director, mode))
+
+    assert direction["prompt_for_character"] == "Tell Ren the truth."
+    assert direction["narration"] == "Rain drums on the roof."
+    assert deltas == {"director.parse_failures": 0, "director.repairs": 0, "director.fallbacks": 0}
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_invalid_reply_is_repaired_once(director, mode):
+    director.direction_llm = FakeListChatModel(responses=['{"narration": "Rain drums', VALID])
+
+    direction, deltas = counter_deltas(lambda: direct(director, mode))
+
+    assert direction["prompt_for_character"] == "Tell Ren the truth."
+    assert deltas == {"director.parse_failures": 1, "director.repairs": 1, "director.fallbacks": 0}
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_reply_still_invalid_after_repair_falls_back_to_the_rules(director, mode):
+    director.direction_llm = FakeListChatModel(responses=["not json", '{"narration": 1}'])
+
+    direction, deltas = counter_deltas(lambda: direct(director, mode))
+
+    assert direction == {"next_character": "Aoi", "respond_to": "Ren", "narration": "",
+                         "prompt_for_character": "Respond to Ren with emotion.", "scene_complete": False}
+    assert deltas == {"director.parse_failures": 1, "director.repairs": 1, "director.fallbacks": 1}
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_failed_repair_call_falls_back_without_raising(director, mode):
+    director.direction_llm = FakeListChatModel(responses=["not json"])
+    director._schema_llm = lambda plan: FailingModel()  # The repair call
+
+    direction, deltas = counter_deltas(lambda: direct(director, mode))
+
+    assert direction["prompt_for_character"] == "Respond to Ren with emotion."
+    assert deltas == {"director.parse_failures": 1, "director.repairs": 1, "director.fallbacks": 1}
+
+
+def test_repair_disabled_falls_back_directly(director, monkeypatch):
+    monkeypatch.setattr(config, "DIRECTOR_REPAIR", False)
+    director.direction_llm = FakeListChatModel(responses=["not json", VALID])
+
+    direction, deltas = counter_deltas(lambda: direct(director, "sync"))
+
+    assert direction["prompt_for_character"] == "Respond to Ren with emotion."
+    assert deltas == {"director.parse_failures": 1, "director.repairs": 0, "director.fallbacks": 1}
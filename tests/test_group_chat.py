@@ -0,0 +1,46 @@
+"""
+Group chat fan-out: independent replies overlap, dependent ones wait
+"""
+import time
+
+import pytest
+
+from services.agent_service import AgentSession
+
+LATENCY = 0.3
+
+
+@pytest.fixture
+def slow_backend(backend):
+    backend.latency = LATENCY
+    yield backend
+    backend.latency = 0.0
+
+
+def make_session() -> AgentSession:
+    session = AgentSession()
+    session.create_agent("A sly fox girl.", "Aoi", 0)
+    session.create_agent("A tired detective.", "Ren", 1)
+    session.create_agent("A cheerful barista.", "Mio", 3)  # Slot 2 left empty
+    return session
+
+
+def timed_group_chat(policy: str):
+    session = make_session()
+    start = time.monotonic()
+    replies = session.group_chat("Where were you last night?", policy)
+    return replies, time.monotonic() - start
+
+
+def test_broadcast_replies_overlap(slow_backend):
+    replies, elapsed = timed_group_chat("broadcast")
+
+    assert sorted(replies) == [0, 1, 3]
+    assert all(replies.values())
+    assert elapsed < 2 * LATENCY  # One round trip, not three
+
+
+def test_chain_replies_run_one_after_another(slow_backend):
+    _, elapsed = timed_group_chat("chain")
+
+    assert elapsed >= 3 * LATENCY
@@ -0,0 +1,132 @@
+"""
+Holara client retries and circuit breaker, against the fake Holara endpoint
+"""
+import asyncio
+import time
+
+import pytest
+
+import config
+from services import async_bridge
+from services.image_service import ImageGenerationService
+
+
+@pytest.fixture
+def service(backend, monkeypatch):
+    monkeypatch.setattr(config, "HOLARA_MAX_RETRIES", 2)
+    monkeypatch.setattr(config, "HOLARA_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(config, "HOLARA_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(config, "HOLARA_BREAKER_RESET", 0.2)
+    while backend.next_holara_fault()[0] is not None:  # Faults a failed test left unused
+        pass
+    return ImageGenerationService()
+
+
+def requests_served(backend) -> int:
+    return backend.stats()["requests"]
+
+
+@pytest.mark.parametrize("fault", [500, 503, 429, "drop"])
+def test_retries_transient_failures(service, backend, fault):
+    backend.fail_holara(fault, fault)
+    before = requests_served(backend)
+
+    result = service.generate_image("a fox girl")
+
+    assert result is not None and result["image_key"]
+    assert requests_served(backend) - before == 3
+    assert service.breaker.state == "closed"
+
+
+def test_async_retries_transient_failures(service, backend):
+    backend.fail_holara(503, "drop")
+
+    result = async_bridge.run(service.agenerate_image("a fox girl"), timeout=10)
+
+    assert result is not None
+    assert service.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried(service, backend):
+    backend.fail_holara(400)
+    before = requests_served(backend)
+
+    assert service.generate_image("a fox girl") is None
+    assert requests_served(backend) - before == 1
+    assert service.breaker.failures == 0
+
+
+def test_honours_retry_after(service, backend):
+    backend.fail_holara(429, retry_after="0.3")
+    start = time.monotonic()
+
+    assert service.generate_image("a fox girl") is not None
+    assert time.monotonic() - start >= 0.3
+
+
+def test_opens_after_consecutive_failures(service, backend):
+    backend.fail_holara(*[503] * 6)
+    assert service.generate_image("a fox girl") is None
+    assert service.breaker.state == "closed"
+    assert service.generate_image("a fox girl") is None
+    assert service.breaker.state == "open"
+
+    before = requests_served(backend)
+    assert service.generate_image("a fox girl") is None
+    assert requests_served(backend) == before  # Rejected without calling Holara
+
+
+def test_half_open_trial_closes_or_reopens(service, backend):
+    backend.fail_holara(*[503] * 6)
+    service.generate_image("a fox girl")
+    service.generate_image("a fox girl")
+    time.sleep(0.25)
+    assert service.breaker.state == "half-open"
+
+    backend.fail_holara(503, 503, 503)  # The trial fails: open again
+    assert service.generate_image("a fox girl") is None
+    assert service.breaker.state == "open"
+
+    time.sleep(0.25)
+    assert service.generate_image("a fox girl") is not None  # The trial succeeds: closed
+    assert service.breaker.state == "closed"
+
+
+def test_unexpected_error_during_trial_does_not_wedge_the_breaker(service, backend, monkeypatch):
+    backend.fail_holara(*[503] * 6)
+    service.generate_image("a fox girl")
+    service.generate_image("a fox girl")
+    time.sleep(0.25)
+
+    def explode(*args, **kwargs):
+        raise ValueError("not a requests error")
+
+    monkeypatch.setattr(service.session, "post", explode)
+    assert service.generate_image("a fox girl") is None
+    assert service.breaker.state == "open"  # Counted as a failed trial
+    monkeypatch.undo()
+
+    time.sleep(0.25)
+    assert service.generate_image("a fox girl") is not None
+    assert service.breaker.state == "closed"
+
+
+def test_cancelled_trial_is_released(service, backend):
+    backend.image_latency = 0.5
+    backend.fail_holara(*[503] * 6)
+    service.generate_image("a fox girl")
+    service.generate_image("a fox girl")
+    time.sleep(0.25)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(service.agenerate_image("a fox girl"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        async_bridge.run(cancel_trial(), timeout=10)
+    finally:
+        backend.image_latency = 0.0
+    assert service.breaker.allow()  # Another trial may run
@@ -0,0 +1,30 @@
+"""
+Content-addressed image store: atomic writes
+"""
+import os
+
+import pytest
+
+from services.image_store import ImageStore
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    store = ImageStore(str(tmp_path))
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        store.put(b"image bytes")
+
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_put_is_idempotent(tmp_path):
+    store = ImageStore(str(tmp_path))
+    key = store.put(b"image bytes")
+
+    assert store.put(b"image bytes") == key
+    assert store.get(key) == b"image bytes"
+    assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 1
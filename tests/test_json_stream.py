@@ -0,0 +1,108 @@
+"""
+Incremental JSON parser: chunk boundaries, escapes, nesting and malformed input,
+and the streaming director's fallback when the parser gives up
+"""
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from services import telemetry
+from services.agent_service import DirectorAgent
+from services.json_stream import IncrementalJSONParser
+
+REPLY = json.dumps({
+    "prompt_for_character": "Say \"hi\"\n\tthen café \U0001F3AC / back\\slash",
+    "narration": "Rain.",
+    "scene_complete": False,
+    "count": 12,
+    "cast": {"lead": ["Aoi", {"mood": "wry }]"}], "extras": []},
+    "tags": ["a", ["b", "c"]],
+}, ensure_ascii=True)
+
+
+def feed_in(parser: IncrementalJSONParser, *chunks: str):
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return completed
+
+
+def test_whole_reply():
+    parser = IncrementalJSONParser()
+    completed = parser.feed(REPLY)
+    assert parser.fields == json.loads(REPLY)
+    assert completed == list(json.loads(REPLY))
+    assert parser.done
+
+
+@pytest.mark.parametrize("split", range(1, len(REPLY)))
+def test_any_two_chunk_split(split):
+    parser = IncrementalJSONParser()
+    feed_in(parser, REPLY[:split], REPLY[split:])
+    assert parser.fields == json.loads(REPLY)
+
+
+def test_one_character_at_a_time():
+    parser = IncrementalJSONParser()
+    feed_in(parser, *REPLY)
+    assert parser.fields == json.loads(REPLY)
+
+
+def test_unicode_escape_split_across_chunks():
+    parser = IncrementalJSONParser()
+    feed_in(parser, '{"a": "caf\\u0', '0e', '9 \\ud83c', '\\udfac"}')
+    assert parser.fields == {"a": "café \U0001F3AC"}
+
+
+def test_fields_complete_as_they_arrive():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"prompt_for_character": "Go on') == []
+    assert parser.key == "prompt_for_character" and parser.partial == "Go on"
+    assert parser.feed('.", "narr') == ["prompt_for_character"]
+    assert parser.fields == {"prompt_for_character": "Go on."}
+
+
+def test_code_fence_and_trailing_text_are_skipped():
+    parser = IncrementalJSONParser()
+    feed_in(parser, "```js", "on\n{\"a\": 1, \"b\": true}", "\n```\nextra {\"c\": 2}")
+    assert parser.fields == {"a": 1, "b": True}
+    assert parser.done
+
+
+def test_unparseable_scalar_is_kept_raw():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": tru, "b": "x"}')
+    assert parser.fields == {"a": "tru", "b": "x"}
+
+
+def test_bad_unicode_escape_raises_value_error():
+    parser = IncrementalJSONParser()
+    with pytest.raises(ValueError):
+        feed_in(parser, '{"a": "\\u12', 'zz"}')
+
+
+def test_truncated_reply_is_incomplete():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": "x", "b": [1, 2')
+    assert parser.fields == {"a": "x"}
+    assert not parser.done
+
+
+def test_streaming_director_falls_back_when_the_parser_fails(backend):
+    director = DirectorAgent()
+    bad = '{"prompt_for_character": "Say \\uZZZZ", "narration": "Rain.", "scene_complete": false}'
+    director.stream_llm = FakeListChatModel(responses=[bad])
+    repaired = json.dumps({"prompt_for_character": "Say hi", "narration": "Rain.", "scene_complete": False})
+    director.direction_llm = FakeListChatModel(responses=[repaired])
+    cues = []
+    before = telemetry.counters().get("director.stream_parse_failures", 0)
+
+    direction = asyncio.run(director.adirect_scene_streaming(
+        "A rainy night.", ["Aoi", "Ren"], exchange_count=0, on_cue=cues.append,
+    ))
+
+    assert cues == []  # No early dispatch from a reply the parser could not read
+    assert direction["prompt_for_character"] == "Say hi"
+    assert telemetry.counters()["director.stream_parse_failures"] == before + 1
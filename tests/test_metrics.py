@@ -0,0 +1,32 @@
+"""
+LLM call instrumentation: one event per call, feeding the metrics registry
+"""
+from services import telemetry
+from services.agent_service import CharacterAgent
+from services.metrics import MetricsRegistry
+
+
+def test_each_chat_call_is_reported_once(backend):
+    agent = CharacterAgent("A sly fox girl.", "Aoi")
+    events = []
+    hook = lambda event, fields: events.append((event, fields))
+    telemetry.add_hook(hook)
+    try:
+        agent.chat("Hello")
+    finally:
+        telemetry.remove_hook(hook)
+
+    llm_events = [(event, fields) for event, fields in events if event.startswith("llm_")]
+    assert [event for event, _ in llm_events] == ["llm_call"]
+    assert llm_events[0][1]["call"] == "character"
+    assert llm_events[0][1]["prompt_tokens"] > 0
+
+
+def test_registry_records_the_cached_share():
+    registry = MetricsRegistry()
+    registry.handle("llm_call", {"call": "character", "model": "m", "wall_time": 0.2,
+                                 "prompt_tokens": 1000, "cached_tokens": 750, "completion_tokens": 20})
+
+    rows = {row["metric"]: row for row in registry.summary()}
+    assert rows["llm_cached_prompt_share"]["mean"] == 0.75
+    assert rows["llm_prompt_tokens"]["count"] == 1
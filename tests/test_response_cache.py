@@ -0,0 +1,47 @@
+"""
+Prompt reply cache: disk failures and the async paths
+"""
+import asyncio
+import os
+
+import pytest
+
+from services.response_cache import ResponseCache
+
+REQUEST = {"model": "gpt-4", "max_tokens": 100, "temperature": 0.3,
+           "messages": [{"role": "user", "content": "Species:  fox girl\n\nHair: silver"}]}
+
+
+def test_write_failure_keeps_the_reply_in_memory(tmp_path):
+    cache = ResponseCache(8, 60, str(tmp_path))
+    key = ResponseCache.key(REQUEST)
+    (tmp_path / key[:2]).write_text("a file where the shard directory should be")
+
+    cache.put(key, "a reply")  # Must not raise
+
+    assert cache.get(key) == "a reply"
+
+
+@pytest.mark.skipif(os.name == "nt" or os.geteuid() == 0, reason="permissions are not enforced")
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(8, 60, str(tmp_path))
+    key = ResponseCache.key(REQUEST)
+    cache.put(key, "a reply")
+    cache._path(key).chmod(0)
+
+    assert ResponseCache(8, 60, str(tmp_path)).get(key) is None
+
+
+def test_async_round_trip_through_disk(tmp_path):
+    key = ResponseCache.key(REQUEST)
+
+    async def round_trip():
+        await ResponseCache(8, 60, str(tmp_path)).aput(key, "a reply")
+        return await ResponseCache(8, 60, str(tmp_path)).aget(key)
+
+    assert asyncio.run(round_trip()) == "a reply"
+
+
+def test_hot_requests_are_not_cached():
+    assert ResponseCache.key(dict(REQUEST, temperature=0.9)) is None
+    assert ResponseCache.key({k: v for k, v in REQUEST.items() if k != "temperature"}) is None
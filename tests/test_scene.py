@@ -0,0 +1,181 @@
+"""
+SceneState bookkeeping and "Redo Last" on a scene played against the fake backend
+"""
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from models.scene import CastMember, SceneState
+from services import telemetry
+from services.agent_service import AgentService
+from services.scene_runner import EVENT, TRUNCATE
+
+CAST = [(0, "Aoi"), (1, "Ren")]
+PREMISE = "The characters are stranded in an arcade during a storm."
+
+
+def play_step(scene: SceneState, name: str, narration: str = ""):
+    scene.begin_step()
+    if narration:
+        scene.add_narration(narration)
+    scene.add_line(name, f"{name} speaks")
+
+
+def test_undo_narration_step():
+    scene = SceneState()
+    play_step(scene, "Aoi", narration="Rain on the glass.")
+    play_step(scene, "Ren")
+    play_step(scene, "Aoi", narration="The lights flicker.")
+
+    assert scene.undo_step()
+    assert len(scene) == 3
+    assert scene.exchange_count == 2
+    assert scene.last_speaker == "Ren"
+    assert scene.narrations == ["Rain on the glass."]
+
+
+def test_undo_line_only_step_keeps_the_step_before():
+    scene = SceneState()
+    play_step(scene, "Aoi", narration="Rain on the glass.")
+    play_step(scene, "Ren")
+
+    assert scene.undo_step()
+    assert [event["content"] for event in scene.events] == ["Rain on the glass.", "Aoi speaks"]
+    assert scene.exchange_count == 1
+    assert scene.last_speaker == "Aoi"
+    assert scene.speaker_counts == {"Aoi": 1, "Ren": 0}
+    assert scene.distinct_speakers == 1
+    assert scene.transcript == 'Aoi: "Aoi speaks"\n'
+
+
+def test_transcript_is_joined_once_per_revision():
+    scene = SceneState()
+    play_step(scene, "Aoi")
+    scene.add_direction("Someone knocks")
+
+    first = scene.transcript
+    assert first == 'Aoi: "Aoi speaks"\n[Direction: Someone knocks]\n'
+    assert scene.transcript is first  # Cached until the scene changes
+
+    play_step(scene, "Ren")
+    assert scene.transcript.endswith('Ren: "Ren speaks"\n')
+    assert scene.undo_step()
+    assert scene.transcript == first
+
+def test_undo_keeps_directions_given_before_the_step():
+    scene = SceneState()
+    play_step(scene, "Aoi")
+    scene.begin_step()  # A step that added nothing
+    scene.add_direction("Someone knocks")
+    play_step(scene, "Ren")
+
+    assert scene.undo_step()
+    assert [event["role"] for event in scene.events] == ["assistant", "user"]
+    assert scene.undo_step()
+    assert len(scene) == 0
+    assert not scene.undo_step()
+
+
+@pytest.fixture
+def session(backend):
+    session = AgentService().for_session("test-scene")
+    for idx, name in CAST:
+        session.create_agent(f"{name}, a regular at the arcade.", name, idx)
+    yield session
+    session.close()
+
+
+def wait_for(runner, kind: str, timeout: float = 10.0) -> list:
+    """Updates polled until one of `kind` arrives"""
+    updates = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        updates.extend(runner.poll())
+        if any(update_kind == kind for update_kind, _ in updates):
+            return updates
+        time.sleep(0.01)
+    raise AssertionError(f"no {kind} update within {timeout} s")
+
+
+@pytest.mark.parametrize("steps, removed", [
+    (1, 2),  # Opening step: narration and line
+    (2, 1),  # Non-narration step: its line only
+    (4, 2),  # Every third exchange is narrated again
+])
+def test_redo_last_drops_exactly_the_last_step(session, steps, removed):
+    scene = SceneState()
+    runner = session.start_scene(scene, PREMISE, CAST, playing=False)
+    for _ in range(steps):
+        runner.step()
+        wait_for(runner, EVENT)  # Published once the step is done
+    runner.pause()
+    length = len(scene)
+    kept = list(scene.events[:length - removed])
+
+    runner.redo_last()
+    runner.pause()
+    truncated = [payload for kind, payload in wait_for(runner, TRUNCATE) if kind == TRUNCATE]
+
+    assert truncated == [length - removed]
+    assert scene.events[:length - removed] == kept  # The redone step may already be replaying after them
+
+
+def test_pipelining_only_speculates_narration_beats(session):
+    scene = SceneState()
+    before = telemetry.counters().get("director.speculation_used", 0)
+    speculated = []
+    for _ in range(4):
+        session.scene_step(scene, PREMISE, CAST, pipelined=True)
+        speculated.append(session._speculation is not None)
+
+    # After lines 1 and 2 the next step is directed locally; after line 3 comes a narration beat
+    assert speculated == [False, False, True, False]
+    assert telemetry.counters().get("director.speculation_used", 0) == before + 1
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_scene_steps_start_no_summary_calls(session, fused):
+    calls = []
+
+    class SummaryModel:
+        async def ainvoke(self, messages):
+            calls.append(messages)
+            return AIMessage(content="summary")
+
+    for idx, _ in CAST:
+        memory = session.get_agent(idx).memory
+        memory.llm = SummaryModel()
+        memory.max_turns = 1  # Every turn past the first is evicted and waits to be summarized
+        memory.summary_every = 2
+
+    scene = SceneState()
+    for _ in range(12):
+        session.scene_step(scene, PREMISE, CAST, fused=fused)
+
+    assert calls == []
+    assert len(session.get_agent(0).memory.pending) == 5
+
+    # The next chat turn folds the backlog in a single call
+    session.chat_with_character("Still there?", 0)
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_characters_sharing_a_name_take_turns(backend, fused):
+    session = AgentService().for_session("test-namesakes")
+    cast = [CastMember(0, "Aoi", "first-aoi"), CastMember(1, "Aoi", "second-aoi")]
+    for idx, name, character_id in cast:
+        session.create_agent(f"{name}, a regular at the arcade.", name, idx, character_id=character_id)
+
+    scene = SceneState()
+    for _ in range(6):
+        session.scene_step(scene, PREMISE, cast, fused=fused)
+    session.close()
+
+    assert scene.speakers == ["first-aoi", "second-aoi"] * 3
+    assert [len(session.get_agent(idx).memory.window) for idx, _, _ in cast] == [3, 3]
+    assert {event["character"] for event in scene.events if event["role"] == "assistant"} == {"Aoi"}